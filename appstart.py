@@ -1,8 +1,7 @@
 import importlib
 import sys,argparse
-from deephaven_server.server import Server
 
-from globalscope import *
+import profiling
 
 JVM_ARGS = [
     "-DAuthHandlers=io.deephaven.auth.AnonymousAuthenticationHandler",
@@ -13,6 +12,9 @@ parser = argparse.ArgumentParser()
 parser.add_argument("-a","--app",dest="app",action="store",type=str,default=None,help="full path to application")
 parser.add_argument("-p","--port",dest="port",action="store",type=int,default=10000,help="server port")
 parser.add_argument("-M","--memory",dest="memgb",action="store",type=int,default=4,help="cap memory in GB")
+parser.add_argument("-w","--warmup",dest="warmup",action="store",type=str,default=None,help="comma separated warm-up plans to run in the background (universes,formulas), after the steps declared by the apps")
+parser.add_argument("-r","--root",dest="root",action="store",type=str,default="data/",help="data root of the universes warm-up")
+parser.add_argument("--profile-startup",dest="profile",action="store_true",default=False,help="report import and server start times")
 
 def main():
 
@@ -21,8 +23,34 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    s = Server(port=cmd_args.port, jvm_args=JVM_ARGS + [f"-Xmx{cmd_args.memgb}g",f"-Ddeephaven.application.dir={cmd_args.app}"])
-    s.start()
+    imports = profiling.ImportTimer().install() if cmd_args.profile else None
+    sections = dict()
+
+    with profiling.Timer(heap=False) as tm:
+        from deephaven_server.server import Server
+    sections["import deephaven_server"] = tm.wall_s
+
+    # Applications are initialized as part of the server start
+    with profiling.Timer(heap=False) as tm:
+        s = Server(port=cmd_args.port, jvm_args=JVM_ARGS + [f"-Xmx{cmd_args.memgb}g",f"-Ddeephaven.application.dir={cmd_args.app}"])
+        s.start()
+    sections["server start (JVM + applications)"] = tm.wall_s
+
+    # Query scope helpers for the console
+    globals().update({k:v for k,v in vars(importlib.import_module("globalscope")).items() if not k.startswith("_")})
+
+    if imports is not None:
+        imports.uninstall()
+        profiling.startupReport(imports,sections)
+
+    # Steps declared by the apps, then the plans asked for on the command line
+    import warmup
+    steps = warmup.declared()
+    if cmd_args.warmup is not None:
+        steps.update(warmup.plan(cmd_args.warmup.split(","),root=cmd_args.root))
+
+    if len(steps)>0:
+        warmup.start(steps)
 
 if __name__=="__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Benchmarks of the analysis and utils hot paths on synthetic NBBO/OPRA data.
+Needs a running server: use benchstart.py
+"""
+
+import os
+import csv
+import typing
+import datetime
+
+from deephaven import agg
+from deephaven.table import Table
+from deephaven.column import int_col
+
+import utils
+import synthetic
+import profiling
+
+from data.analysis import MBP1,TCBBO
+
+#########################################
+#########################################
+
+FIELDS = ["timestamp","version","operation","rows","output_rows","wall_s","peak_heap_mb","rows_per_second"]
+
+# Feature used by the event studies: sign of the top of book size imbalance
+FEATURE = ["imb = (int)signum(bid_sz_00 - ask_sz_00)","forecast_imb = 0.005*imb"]
+
+def dataset(n:int,opra_fraction:float=0.1,seed:int=0) -> typing.Dict:
+
+    mbp1 = MBP1.fromTable(None,synthetic.nbbo(n,seed=seed))
+
+    opra = synthetic.opraTrades(max(1,int(n*opra_fraction)),seed=seed+1)
+    tcbbo = TCBBO.fromTables(None,opra["data"],opra["opts"],opra["feeds"])
+
+    return {"mbp1":mbp1,"tcbbo":tcbbo}
+
+# Operations: name -> (input table,operation)
+def operations(ds:typing.Dict) -> typing.Dict[str,typing.Tuple[Table,typing.Callable[[],Table]]]:
+
+    mbp1 = ds["mbp1"]
+    tcbbo = ds["tcbbo"]
+
+    trades = mbp1.trades()
+    evs = trades.update(FEATURE)
+    lag = next(MBP1.TIMELAGS.iter_dict())
+
+    hook = lambda m:m.universe.update(FEATURE)
+
+    return {
+        "MBP1.returns": (trades,lambda:mbp1.returns(trades,lag)),
+        "MBP1.analyzeEvents": (evs,lambda:mbp1.analyzeEvents(evs,feature_names=["imb"],ticklags=[1,10])),
+        "TCBBO.analyzeTag": (tcbbo.universe,lambda:tcbbo.analyzeTag(mbp1,hook,features=["imb"],bys=["venue"])),
+        "TCBBO.analyzeMove": (tcbbo.universe,lambda:tcbbo.analyzeMove(mbp1,hook,bys=["venue","expiry_type"])),
+        "utils.pivot": (tcbbo.universe,lambda:utils.pivot(tcbbo.universe,["instrument_id"],"venue","size")),
+        "utils.binColumn": (tcbbo.universe,lambda:utils.binColumn(tcbbo.universe,col=int_col("days2expiry",[0,1,10,21,100]),signed=False)),
+        "utils.hmerge": (tcbbo.universe,lambda:utils.hmerge(tcbbo.universe.view(["price"]),tcbbo.universe.view(["size"])))
+    }
+
+def run(sizes:typing.List[int],ops:typing.List[str]|None=None,output:str="bench_results.csv",version:str="unknown",opra_fraction:float=0.1,seed:int=0) -> typing.List[typing.Dict]:
+
+    results = []
+
+    for n in sizes:
+
+        print(f"[+] Generating {n} rows")
+        ds = dataset(n,opra_fraction,seed)
+
+        for name,(tin,op) in operations(ds).items():
+
+            if (ops is not None) and (not name in ops):
+                continue
+
+            with profiling.Timer() as tm:
+                tout = op()
+
+            res = {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "version": version,
+                "operation": name,
+                "rows": tin.size,
+                "output_rows": tout.size,
+                "wall_s": round(tm.wall_s,4),
+                "peak_heap_mb": round(tm.peak_heap_mb,1),
+                "rows_per_second": round(tin.size / tm.wall_s,1) if tm.wall_s>0 else float("nan")
+            }
+
+            print(f"[+] {name:20s} rows={res['rows']:<12d} wall={res['wall_s']:.3f}s heap={res['peak_heap_mb']:.0f}MB")
+            results.append(res)
+            append(output,[res])
+
+            del(tout)
+
+    return results
+
+#########################################
+#########################################
+
+def append(path:str,results:typing.List[typing.Dict]) -> None:
+
+    new = not os.path.exists(path)
+    with open(path,"a",newline="") as f:
+        w = csv.DictWriter(f,fieldnames=FIELDS)
+        if new:
+            w.writeheader()
+        w.writerows(results)
@@ -0,0 +1,64 @@
+import csv
+import sys,argparse
+import subprocess
+from deephaven_server.server import Server
+
+JVM_ARGS = [
+    "-DAuthHandlers=io.deephaven.auth.AnonymousAuthenticationHandler",
+    "-Dprocess.info.system-info.enabled=false"
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-s","--sizes",dest="sizes",action="store",type=str,default="1e6,1e7",help="comma separated number of NBBO rows")
+parser.add_argument("-o","--ops",dest="ops",action="store",type=str,default=None,help="comma separated operations (default all)")
+parser.add_argument("-f","--opra-fraction",dest="opra_fraction",action="store",type=float,default=0.1,help="OPRA trades rows as a fraction of NBBO rows")
+parser.add_argument("-r","--results",dest="results",action="store",type=str,default="bench_results.csv",help="results file (appended)")
+parser.add_argument("-v","--version",dest="version",action="store",type=str,default=None,help="version label (default git revision)")
+parser.add_argument("-c","--compare",dest="compare",action="store_true",default=False,help="compare versions in the results file and exit")
+parser.add_argument("-p","--port",dest="port",action="store",type=int,default=10000,help="server port")
+parser.add_argument("-M","--memory",dest="memgb",action="store",type=int,default=8,help="cap memory in GB")
+
+def gitVersion() -> str:
+    try:
+        return subprocess.check_output(["git","rev-parse","--short","HEAD"],text=True).strip()
+    except (OSError,subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(path:str) -> None:
+
+    """
+    Wall time per (operation,rows), one column per version
+    """
+
+    with open(path,newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    versions = list(dict.fromkeys([r["version"] for r in rows]))
+    wall = {(r["operation"],int(r["rows"]),r["version"]):float(r["wall_s"]) for r in rows}
+    keys = sorted(set([(k[0],k[1]) for k in wall]))
+
+    print(f"{'operation':20s} {'rows':>12s} " + " ".join([f"{v:>12s}" for v in versions]))
+    for op,n in keys:
+        print(f"{op:20s} {n:12d} " + " ".join([f"{wall[(op,n,v)]:12.3f}" if (op,n,v) in wall else f"{'-':>12s}" for v in versions]))
+
+def main():
+
+    cmd_args = parser.parse_args(sys.argv[1:])
+
+    if cmd_args.compare:
+        compare(cmd_args.results)
+        sys.exit(0)
+
+    s = Server(port=cmd_args.port, jvm_args=JVM_ARGS + [f"-Xmx{cmd_args.memgb}g"])
+    s.start()
+
+    import bench
+
+    bench.run(sizes=[int(float(x)) for x in cmd_args.sizes.split(",")],
+              ops=cmd_args.ops.split(",") if cmd_args.ops is not None else None,
+              output=cmd_args.results,
+              version=cmd_args.version if cmd_args.version is not None else gitVersion(),
+              opra_fraction=cmd_args.opra_fraction)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Block bootstrap confidence intervals of metrics derived from additive statistics (counts, sums, e.g. the sXX/sXY/sYY
+of the event studies). The statistics are summed per group and block (e.g. date) in the engine; the resampling is
+done in numpy on the small groups x blocks x stats array, all bootstrap replicas at once. Blocks are resampled
+jointly across groups, which keeps the dependence between groups observed on the same block
+"""
+
+import ast
+import typing
+import warnings
+
+import numpy as np
+
+from deephaven import agg,new_table
+from deephaven.table import Table
+from deephaven.column import long_col,double_col
+import deephaven.numpy as dhnp
+
+NBOOT = 1000
+
+# Functions allowed in derived formulas besides arithmetic
+FUNCTIONS = {"abs":np.abs,"sqrt":np.sqrt,"log":np.log,"exp":np.exp}
+
+OPERATORS = {ast.Add:np.add,ast.Sub:np.subtract,ast.Mult:np.multiply,ast.Div:np.divide,ast.Pow:np.power}
+UNARY = {ast.USub:np.negative,ast.UAdd:np.positive}
+
+def parse(formula:str,names:typing.List[str]) -> ast.AST|None:
+
+    """
+    Syntax tree of a derived formula if it only uses arithmetic, FUNCTIONS, numbers and the statistics names,
+    None otherwise (e.g. engine syntax: ternaries, casts, isNull)
+    """
+
+    try:
+        tree = ast.parse(formula.strip(),mode="eval").body
+    except SyntaxError:
+        return None
+
+    def ok(n:ast.AST) -> bool:
+        match n:
+            case ast.BinOp():
+                return (type(n.op) in OPERATORS) and ok(n.left) and ok(n.right)
+            case ast.UnaryOp():
+                return (type(n.op) in UNARY) and ok(n.operand)
+            case ast.Name():
+                return n.id in names
+            case ast.Constant():
+                return isinstance(n.value,(int,float)) and not isinstance(n.value,bool)
+            case ast.Call():
+                return isinstance(n.func,ast.Name) and (n.func.id in FUNCTIONS) and (len(n.keywords)==0) and all([ok(a) for a in n.args])
+            case _:
+                return False
+
+    return tree if ok(tree) else None
+
+def supported(formula:str,names:typing.List[str]) -> bool:
+    return parse(formula,names) is not None
+
+def evaluate(formula:str,stats:typing.Dict[str,np.ndarray]) -> np.ndarray:
+
+    """
+    Evaluate an arithmetic formula of the statistics, e.g. "sXY/sXX" (see parse for what is allowed)
+    """
+
+    tree = parse(formula,list(stats.keys()))
+    if tree is None:
+        raise ValueError(f"Unsupported formula for the bootstrap: {formula}")
+
+    def ev(n:ast.AST):
+        match n:
+            case ast.BinOp():
+                return OPERATORS[type(n.op)](ev(n.left),ev(n.right))
+            case ast.UnaryOp():
+                return UNARY[type(n.op)](ev(n.operand))
+            case ast.Name():
+                return stats[n.id]
+            case ast.Constant():
+                return n.value
+            case ast.Call():
+                return FUNCTIONS[n.func.id](*[ev(a) for a in n.args])
+
+    with np.errstate(divide="ignore",invalid="ignore",over="ignore"):
+        return np.asarray(ev(tree),dtype=np.float64)
+
+def weights(nblocks:int,nboot:int=NBOOT,seed:int=0) -> np.ndarray:
+
+    """
+    Number of times each block is drawn, one row per bootstrap replica
+    """
+
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(nblocks,np.full(nblocks,1.0/nblocks),size=nboot).astype(np.float64)
+
+def blockBootstrap(t:Table,by:typing.List[str],block:str,stats:typing.List[str],derived:typing.Dict[str,str],nboot:int=NBOOT,alpha:float=0.05,seed:int=0,max_mb:float=256) -> Table:
+
+    """
+    Per group of by: point estimate, standard error and (alpha/2,1-alpha/2) percentile interval of each derived
+    metric (name -> formula of stats). Output columns: by,{name},{name}_se,{name}_lo,{name}_hi. Metrics whose formula
+    is not supported (see parse) are left out
+    """
+
+    derived = {name:formula for name,formula in derived.items() if supported(formula,stats)}
+
+    # Integer group and block ids, statistics summed per (group,block)
+    groups = t.select_distinct(by).update("__g = ii")
+    blocks = t.select_distinct(block).update("__b = ii")
+
+    tb = t.natural_join(groups,on=by,joins="__g").natural_join(blocks,on=block,joins="__b")
+    tb = tb.agg_by([agg.sum_(s) for s in stats],by=["__g","__b"])
+
+    arr = dhnp.to_numpy(tb.view(["__g = (double)__g","__b = (double)__b"] + [f"{s} = (double){s}" for s in stats]))
+
+    ng,nb = groups.size,blocks.size
+    suff = np.zeros((ng,nb,len(stats)))
+    np.add.at(suff,(arr[:,0].astype(np.int64),arr[:,1].astype(np.int64)),arr[:,2:])
+
+    w = weights(nb,nboot,seed) if nb>0 else np.zeros((nboot,0))
+
+    # Replicas: (nboot,groups,stats), computed in chunks of groups to bound memory
+    chunk = max(1,int(max_mb * 1024**2 / (8 * nboot * max(1,len(stats)))))
+    out = {name:{k:np.empty(ng) for k in ["est","se","lo","hi"]} for name in derived}
+
+    for g0 in range(0,ng,chunk):
+
+        s = suff[g0:g0+chunk]
+        point = s.sum(axis=1)
+        reps = np.einsum("rb,gbs->rgs",w,s)
+
+        for name,formula in derived.items():
+
+            est = evaluate(formula,{x:point[:,i] for i,x in enumerate(stats)})
+            rep = evaluate(formula,{x:reps[:,:,i] for i,x in enumerate(stats)})
+            rep = np.where(np.isfinite(rep),rep,np.nan)
+
+            # Groups without a finite replica get NaN intervals
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore",category=RuntimeWarning)
+                out[name]["est"][g0:g0+chunk] = est
+                out[name]["se"][g0:g0+chunk] = np.nanstd(rep,axis=0)
+                out[name]["lo"][g0:g0+chunk] = np.nanquantile(rep,alpha/2,axis=0)
+                out[name]["hi"][g0:g0+chunk] = np.nanquantile(rep,1-alpha/2,axis=0)
+
+    cols = [long_col("__g",list(range(ng)))]
+    for name,o in out.items():
+        cols += [double_col(name,o["est"]),double_col(f"{name}_se",o["se"]),double_col(f"{name}_lo",o["lo"]),double_col(f"{name}_hi",o["hi"])]
+
+    return groups.natural_join(new_table(cols),on="__g").drop_columns(["__g"])
@@ -1,19 +1,25 @@
+from __future__ import annotations
+
 import os
 import typing
 import itertools
 
-import pandas as pd
-import databento as db
+import lazy
+pd = lazy.module("pandas")
+db = lazy.module("databento")
 
 class Client():
 
     def __init__(self,root="data/") -> None:
-        self._client = db.Historical()
+        self._client = None
         self._root = root
         self._feeds = pd.DataFrame()
 
     @property
     def client(self):
+        # Connect on first use: reading what is on disk does not need databento
+        if self._client is None:
+            self._client = db.Historical()
         return self._client
 
     @property
@@ -32,8 +38,8 @@ class Client():
 
             return None
 
-        pub = pd.DataFrame(self._client.metadata.list_publishers())
-        pub["schemas"] = pub.dataset.apply(lambda dn:self._client.metadata.list_schemas(dn))
+        pub = pd.DataFrame(self.client.metadata.list_publishers())
+        pub["schemas"] = pub.dataset.apply(lambda dn:self.client.metadata.list_schemas(dn))
 
         self._feeds = pub.copy()
 
@@ -64,9 +70,9 @@ class Client():
         start = dct["start"]
         del(dct["start"])
 
-        return {"num_records" : self._client.metadata.get_record_count(start=start,**dct),
-                "cost" : self._client.metadata.get_cost(start=start,**dct),
-                "size_gb": self._client.metadata.get_billable_size(start=start,**dct) / 1024**3}
+        return {"num_records" : self.client.metadata.get_record_count(start=start,**dct),
+                "cost" : self.client.metadata.get_cost(start=start,**dct),
+                "size_gb": self.client.metadata.get_billable_size(start=start,**dct) / 1024**3}
 
     # Run one query
     def onequery(self,mode="",**kwargs) -> typing.Dict|db.DBNStore:
@@ -79,13 +85,13 @@ class Client():
             case "run":
                 pth = self.path(date=kwargs["date"],dataset=kwargs["dataset"],schema=kwargs["schema"])
 
-                data = self._client.timeseries.get_range(start=start,**dct)
+                data = self.client.timeseries.get_range(start=start,**dct)
                 print(f"[+] Saving query to: {pth}")
                 data.to_file(pth)
 
                 return data
             case "submit_batch":
-                return self._client.batch.submit_job(start=start,**dct)
+                return self.client.batch.submit_job(start=start,**dct)
             case _:
                 raise ValueError("Mode not recognized")
     
@@ -1,14 +1,20 @@
 import typing
 
 from deephaven import agg,merge,new_table
-from deephaven.column import int_col,string_col
+from deephaven.column import int_col,string_col,double_col
+import deephaven.numpy as dhnp
 from deephaven.table import Table
 from deephaven.updateby import rolling_formula_tick
 
 from . import dbclient
+from . import bars
+from . import features
+from . import greeks
 
 import utils
+import sketch
 import gui
+from gui import rollup
 
 #########################################
 #########################################
@@ -26,6 +32,29 @@ def makeLagTable(lags:typing.List[str],symmetric:bool=False) -> Table:
 
     return tbl.sort("duration")
 
+def withBlock(t:Table,block:str|None) -> Table:
+
+    """
+    Add the block column of the bootstrap (date is derived from ts_event)
+    """
+
+    if (block is None) or (block in t.column_names):
+        return t
+
+    if block=="date":
+        return t.update("date = date_et" if "date_et" in t.column_names else "date = ts_event.atZone('ET').toLocalDate()")
+
+    raise ValueError(f"Block column {block} not in table")
+
+def withTimeOfDay(t:Table) -> Table:
+
+    """
+    hour and minute (ET LocalTime) joined on the integer minute_et bucket
+    """
+
+    t = dbclient.timeBuckets(t)
+    return t.natural_join(dbclient.timeOfDay(),on="minute_et",joins=["hour","minute"])
+
 #########################################
 #########################################
 
@@ -35,9 +64,15 @@ class MBP1(object):
     TIMELAGS = makeLagTable(["0.01s","0.1s","1s","10s","1m"],symmetric=False)
 
     @classmethod
-    def fromDB(cls,dbclient:dbclient.DBHClient):
+    def fromDB(cls,dbclient:dbclient.DBHClient,filters:typing.List[str]=[]):
+
+        data = dbclient.readTable("databento_nbbo",filters)
+
+        return cls.fromTable(dbclient,data)
+
+    @classmethod
+    def fromTable(cls,dbclient:dbclient.DBHClient|None,data:Table):
 
-        data = dbclient.readTable("databento_nbbo")
         data = data.update("mid = 0.5*(bid_px_00 + ask_px_00)")
         data = data.sort("ts_event")
 
@@ -60,6 +95,17 @@ class MBP1(object):
         trd = trd.update("sideimpl = price<=bid_px_00 ? -1 : (price>=ask_px_00 ? 1 : NULL_INT)")
         return trd
 
+    def bars(self,freqs:typing.List[str]=bars.FREQS,by:typing.List[str]=["symbol"]) -> bars.Bars:
+        return bars.Bars(self.universe,freqs,by)
+
+    def features(self,feats:typing.List[features.Feature]=features.DEFAULT,by:typing.List[str]=["symbol"]) -> Table:
+
+        """
+        Universe with the order book features (<name>,forecast_<name>) for analyzeEvents
+        """
+
+        return features.compute(self.universe,feats,by)
+
     ################################################################################################
 
     # Calculate returns
@@ -71,7 +117,11 @@ class MBP1(object):
 
         return samples
 
-    def analyzeEvents(self,evs:Table,feature_names:typing.List[str]=[],timelags:Table=TIMELAGS,ticklags = [1,5,10,50,100]) -> Table:
+    def analyzeEvents(self,evs:Table,feature_names:typing.List[str]=[],timelags:Table=TIMELAGS,ticklags = [1,5,10,50,100],block:str|None=None) -> Table:
+
+        """
+        block: also group by this column (e.g. date), keeping the sufficient statistics per block for bootstrap.blockBootstrap
+        """
 
         aggr_price = [agg.count_("nsamples"),
                       agg.avg("forecast"),
@@ -89,6 +139,9 @@ class MBP1(object):
 
         tagg = []
 
+        evs = withBlock(evs,block)
+        by = ["feature_value"] + ([block] if block is not None else [])
+
         # Time based lags
         for it in timelags.iter_dict():
 
@@ -99,8 +152,8 @@ class MBP1(object):
 
                 evret = evret.rename_columns([f"forecast = forecast_{feat}"]).update([f"feature_value = (double){feat}","forecast_bps = 1e4*forecast / mid"])
 
-                tagg.append(evret.agg_by(aggr_price,by=["feature_value"]).update([f"feature_name = `{feat}`",f"horizon = `{it['horizon']}`","unit = `price`","clock = `physical`"]))
-                tagg.append(evret.agg_by(aggr_bps,by=["feature_value"]).update([f"feature_name = `{feat}`",f"horizon = `{it['horizon']}`","unit = `bps`","clock = `physical`"]))
+                tagg.append(evret.agg_by(aggr_price,by=by).update([f"feature_name = `{feat}`",f"horizon = `{it['horizon']}`","unit = `price`","clock = `physical`"]))
+                tagg.append(evret.agg_by(aggr_bps,by=by).update([f"feature_name = `{feat}`",f"horizon = `{it['horizon']}`","unit = `bps`","clock = `physical`"]))
 
         # Tick based lags
         for tk in ticklags:
@@ -112,8 +165,8 @@ class MBP1(object):
 
                 evret = evret.rename_columns([f"forecast = forecast_{feat}"]).update([f"feature_value = (double){feat}","forecast_bps = 1e4*forecast / mid"])
 
-                tagg.append(evret.agg_by(aggr_price,by=["feature_value"]).update([f"feature_name = `{feat}`",f"horizon = `{tk}`","unit = `price`","clock = `ticks`"]))
-                tagg.append(evret.agg_by(aggr_bps,by=["feature_value"]).update([f"feature_name = `{feat}`",f"horizon = `{tk}`","unit = `bps`","clock = `ticks`"]))
+                tagg.append(evret.agg_by(aggr_price,by=by).update([f"feature_name = `{feat}`",f"horizon = `{tk}`","unit = `price`","clock = `ticks`"]))
+                tagg.append(evret.agg_by(aggr_bps,by=by).update([f"feature_name = `{feat}`",f"horizon = `{tk}`","unit = `bps`","clock = `ticks`"]))
 
         return merge(tagg)
 
@@ -123,12 +176,16 @@ class TCBBO(object):
     TIMELAGS = makeLagTable(["0.01s","0.1s","1s","10s","1m"],symmetric=True)
 
     @classmethod
-    def fromDB(cls,dbclient:dbclient.DBHClient):
+    def fromDB(cls,dbclient:dbclient.DBHClient,filters:typing.List[str]=[]):
+
+        data = dbclient.readTable("opra_trades",filters,buckets=True)
 
-        opts = dbclient.options()
-        data = dbclient.readTable("opra_trades")
+        return cls.fromTables(dbclient,data,dbclient.options(),dbclient.feeds)
+
+    @classmethod
+    def fromTables(cls,dbclient:dbclient.DBHClient|None,data:Table,opts:Table,feeds:Table):
 
-        data = data.natural_join(dbclient.feeds,on="publisher_id",joins="venue")
+        data = data.natural_join(feeds,on="publisher_id",joins="venue")
         data = data.natural_join(opts,on="instrument_id",joins=["days2expiry","typ = instrument_class","strike_price"])
 
         # Replace NaN
@@ -155,9 +212,36 @@ class TCBBO(object):
     def universe(self) -> Table:
         return self._universe
 
+    def withGreeks(self,mbp1:MBP1,rate:float=0.0,dividend:float=0.0) -> "TCBBO":
+
+        """
+        Implied vol and greeks of every trade against the as-of underlying mid (on a snapshot of the universe), plus
+        the delta and vega weighted flows (signed by the implied side, puts have negative delta)
+        """
+
+        optrd = self.universe.snapshot().aj(mbp1.universe,on="ts_event",joins=["und_mid = mid"])
+
+        ts = dhnp.to_numpy(optrd.view(["__ts = epochNanos(ts_event)"]))[:,0]
+        arr = dhnp.to_numpy(optrd.view([
+            "__px = (double)price",
+            "__S = isNull(und_mid) ? Double.NaN : und_mid",
+            "__K = isNull(strike_price) ? Double.NaN : strike_price",
+            "__d2e = isNull(days2expiry) ? Double.NaN : days2expiry",
+            "__call = typ==`C` ? 1.0 : 0.0"]))
+
+        res = greeks.compute(ts,arr[:,0],arr[:,1],arr[:,2],arr[:,3],arr[:,4]==1.0,rate,dividend)
+
+        data = utils.hmerge(optrd,new_table([double_col(k,v) for k,v in res.items()]))
+        data = data.update([
+            "delta_flow = isNaN(delta) ? NULL_DOUBLE : sideimpl * size * delta",
+            "vega_flow = isNaN(vega) ? NULL_DOUBLE : sideimpl * size * vega",
+            "delta_size = isNaN(delta) ? NULL_DOUBLE : size * abs(delta)"])
+
+        return TCBBO(self.dbclient,data)
+
     ##################################################
 
-    def analyzeTag(self,mbp1:MBP1,mbp1Hook:typing.Callable[[MBP1],Table],features:typing.List[str],bys:typing.List[str]) -> Table:
+    def analyzeTag(self,mbp1:MBP1,mbp1Hook:typing.Callable[[MBP1],Table],features:typing.List[str],bys:typing.List[str],block:str|None=None) -> Table:
 
         calcs = [
             agg.count_("num_samples"),
@@ -169,6 +253,10 @@ class TCBBO(object):
             agg.sum_(f"{x}") for x in ["sXX","sYY","sXY"]
         ]
 
+        # Delta weighted flow (withGreeks)
+        if "delta_flow" in self.universe.column_names:
+            calcs += [agg.sum_("net_delta_flow = delta_flow"),agg.sum_("net_vega_flow = vega_flow"),agg.sum_("delta_contracts = delta_size")]
+
         # Ignore unsigned trades
         optrd = self.universe.snapshot().where("!isNull(sideimpl)")
 
@@ -179,14 +267,15 @@ class TCBBO(object):
 
 
         # Bucketing
-        optrd = optrd.update([
-            "hour = lowerBin(ts_event,HOUR).atZone('ET').toLocalTime()",
-            "minute = lowerBin(ts_event,MINUTE).atZone('ET').toLocalTime()"
-            ])
+        optrd = withTimeOfDay(optrd)
 
         optrd = utils.binColumn(optrd,col=int_col("days2expiry",[0,1,10,21,100]),signed=False)
         optrd = utils.binColumn(optrd,col=int_col("days2expiry",[0,1]),out=string_col("expiry_type",["zdte","other"]),signed=False)
 
+        # Sufficient statistics per block (bootstrap)
+        optrd = withBlock(optrd,block)
+        bys = bys + ([block] if block is not None else [])
+
         # Collect aggregations
         trdagg = []
         for fn in features:
@@ -206,13 +295,10 @@ class TCBBO(object):
         optrd = utils.binColumn(optrd,col=int_col("days2expiry",[0,1,10,21,100]),signed=False)
         optrd = utils.binColumn(optrd,col=int_col("days2expiry",[0,1]),out=string_col("expiry_type",["zdte","other"]),signed=False)
 
-        optrd = optrd.update([
-            "hour = lowerBin(ts_event,HOUR).atZone('ET').toLocalTime()",
-            "minute = lowerBin(ts_event,MINUTE).atZone('ET').toLocalTime()"
-            ])
+        optrd = withTimeOfDay(optrd)
 
         # Exclude first 5 min
-        optrd = optrd.where("minute > '09:35'")
+        optrd = optrd.where("minute_et > 5")
 
         # aj other source (with lags) + calculate aggregation metrics
         tagg = []
@@ -233,7 +319,8 @@ class TCBBO(object):
         for lg in lags.iter_dict():
             trdlag = mbp1.returns(optrd,lg)
             trdlag = trdlag.update(["mid_change = mid_fwd - mid","sided_move = sidedelta*mid_change"])
-            tagg.append(trdlag.agg_by(calcs,by=bys).update(["horizon = `{horizon}`".format(**lg)]))
+            trdagg = trdlag.agg_by(calcs,by=bys).natural_join(sketch.sketchOf(trdlag,"sided_move",bys,"move"),on=bys,joins=sketch.columns("move"))
+            tagg.append(trdagg.update(["horizon = `{horizon}`".format(**lg)]))
 
         return merge(tagg)
 
@@ -245,12 +332,12 @@ class Mbp1Gui(gui.dashboard.Manager):
 
     def aggregations(self) -> typing.Dict:
         return  {
-            "nsamples": agg.sum_("nsamples"),
-            "realized": agg.weighted_avg(wcol="nsamples",cols=["realized"]),
-            "forecast": agg.weighted_avg(wcol="nsamples",cols=["forecast"]),
-            "sXX":      agg.sum_("sXX"),
-            "sXY":      agg.sum_("sXY"),
-            "sYY":      agg.sum_("sYY")
+            "nsamples": rollup.sum_("nsamples"),
+            "realized": rollup.weighted_avg("realized",wcol="nsamples"),
+            "forecast": rollup.weighted_avg("forecast",wcol="nsamples"),
+            "sXX":      rollup.sum_("sXX"),
+            "sXY":      rollup.sum_("sXY"),
+            "sYY":      rollup.sum_("sYY")
         }
 
     def derived(self) -> typing.Dict:
@@ -271,6 +358,9 @@ class Mbp1Gui(gui.dashboard.Manager):
     def mustConstrain(self) -> typing.List[str]:
         return ["horizon","clock","unit","feature_name"]
 
+    def bootstrapBlock(self) -> str|None:
+        return "date" if "date" in self.data.column_names else None
+
     def featureBuckets(self) -> typing.List[str]:
         return ["feature_value"]
 
@@ -282,18 +372,27 @@ class OpraFeatGui(gui.dashboard.Manager):
 
     def aggregations(self) -> typing.Dict:
         calcs = {
-            x: agg.sum_(x) for x in ["num_samples","num_contracts","net_contracts","net_contracts_delta"]
+            x: rollup.sum_(x) for x in ["num_samples","num_contracts","net_contracts","net_contracts_delta"]
         }
 
-        calcs["moneyness"] = agg.weighted_avg(wcol="num_contracts",cols="moneyness")
+        if "net_delta_flow" in self.data.column_names:
+            calcs.update({x: rollup.sum_(x) for x in ["net_delta_flow","net_vega_flow","delta_contracts"]})
+
+        calcs["moneyness"] = rollup.weighted_avg("moneyness",wcol="num_contracts")
         return calcs
 
     def derived(self) -> typing.Dict[str,typing.Tuple[str,typing.List[str]]]:
-        return {
+
+        derived = {
             "delta_imbalance" : ("net_contracts_delta/num_contracts",["net_contracts_delta","num_contracts"]),
             "net_imbalance" : ("net_contracts/num_contracts",["net_contracts","num_contracts"])
         }
 
+        if "net_delta_flow" in self.data.column_names:
+            derived["delta_flow_imbalance"] = ("net_delta_flow/delta_contracts",["net_delta_flow","delta_contracts"])
+
+        return derived
+
     def canFilter(self,data:Table) -> typing.List[str]:
         return [c for c in data.column_names if not c in self.aggregations().keys()]
 
@@ -306,6 +405,9 @@ class OpraFeatGui(gui.dashboard.Manager):
     def mustConstrain(self) -> typing.List[str]:
         return ["feature_name"]
 
+    def bootstrapBlock(self) -> str|None:
+        return "date" if "date" in self.data.column_names else None
+
     def featureBuckets(self) -> typing.List[str]:
         return ["feature_value","feature_value_abs"]
 
@@ -316,17 +418,20 @@ class OpraMoveGui(gui.dashboard.Manager):
 
     def aggregations(self) -> typing.Dict:
         calcs = {
-            x: agg.sum_(x) for x in ["num_samples","num_contracts"]
+            x: rollup.sum_(x) for x in ["num_samples","num_contracts"]
         }
 
-        calcs["sided_move"] = agg.weighted_avg(wcol="num_contracts",cols="sided_move")
+        calcs["sided_move"] = rollup.weighted_avg("sided_move",wcol="num_contracts")
+        calcs["move"] = rollup.distribution("move")
         return calcs
 
     def derived(self) -> typing.Dict[str,typing.Tuple[str,typing.List[str]]]:
-        return{}
+        return {
+            f"sided_move_p{int(100*q)}": (f"sketchQuantile(move_bkt,move_cnt,{q})",["move"]) for q in [0.1,0.5,0.9]
+        }
 
     def canFilter(self,data:Table) -> typing.List[str]:
-        return [c for c in data.column_names if not c in self.aggregations().keys()]
+        return [c for c in data.column_names if (not c in self.aggregations().keys()) and (not c in sketch.columns("move"))]
 
     def multipleSelect(self) -> typing.List[str]:
         return ["venue","days2expiry_bin"]
@@ -0,0 +1,151 @@
+"""
+Bars from MBP-1 ticks: trade OHLCV and VWAP, time weighted mid. 1s bars are built from the ticks in one pass over
+the sorted universe and the coarser frequencies are rolled up from the 1s bars. The roll-up is exact: the sums are
+additive, and the quote in force through seconds without ticks is carried over. Everything is an incremental
+engine operation, so the bars of a ticking universe tick as well
+"""
+
+import os
+import typing
+
+import deephaven.parquet as dhpq
+from deephaven import agg,merge
+from deephaven.table import Table,PartitionedTable
+from deephaven.updateby import rolling_formula_tick
+
+UNITS = {"s":10**9,"m":60*10**9,"h":3600*10**9}
+
+FREQS = ["1s","10s","1m","5m"]
+
+def nanos(freq:str) -> int:
+    return int(freq[:-1]) * UNITS[freq[-1]]
+
+#########################################
+#########################################
+
+def _rollQuotes(items:Table,by:typing.List[str],freq:int) -> Table:
+
+    """
+    Time weighted mid per bar. Items (ticks or finer bars) start at __s and cover [__s,__s+__len) with partial sums
+    __num (mid x time) and __den (time); the mid in force after the item (__mid) lasts until the next item
+    """
+
+    items = items.update_by([
+        rolling_formula_tick(formula="__next = last(__s)",fwd_ticks=1),
+        rolling_formula_tick(formula="__prev_s = first(__s)",rev_ticks=2),
+        rolling_formula_tick(formula="__prev_mid = first(__mid)",rev_ticks=2)
+    ],by=by)
+
+    # Formula columns: read once per item by the aggregation, never stored
+    items = items.update_view([
+        f"__B = __s - __s % {freq}L",
+        f"__E = __B + {freq}L",
+
+        # Until the next item or the end of the bar
+        "__gap = max(0L,min(isNull(__next) ? __E : __next,__E) - (__s + __len))",
+
+        # From the start of the bar, when the previous item is in an earlier bar
+        "__lead = __prev_s < __B ? __s - __B : 0L",
+
+        "__num = __num + __mid*__gap + (__lead>0 ? __prev_mid*__lead : 0.0)",
+        "__den = __den + __gap + __lead"
+    ])
+
+    bars = items.agg_by([agg.sum_(["__num","__den"]),agg.last("__mid")],by=by + ["__B"])
+    return bars.update(["__s = __B",f"__len = {freq}L"]).drop_columns(["__B"])
+
+def _rollTrades(trades:Table,by:typing.List[str],freq:int) -> Table:
+
+    trades = trades.update_view(f"__B = __s - __s % {freq}L")
+
+    bars = trades.agg_by([
+        agg.first("open"),
+        agg.max_("high"),
+        agg.min_("low"),
+        agg.last("close"),
+        agg.sum_(["volume","notional","trades"])
+    ],by=by + ["__B"])
+
+    return bars.rename_columns(["__s = __B"])
+
+def _output(quotes:Table,trades:Table,by:typing.List[str],freq:str) -> Table:
+
+    bars = quotes.natural_join(trades,on=by + ["__s"],joins=["open","high","low","close","volume","notional","trades"])
+    bars = bars.update([
+        "ts_bar = epochNanosToInstant(__s)",
+        f"freq = `{freq}`",
+        "vwap = notional / volume",
+        "twap_mid = __num / __den",
+        "mid_last = __mid"
+    ])
+
+    return bars.view(by + ["freq","ts_bar","open","high","low","close","volume","trades","notional","vwap","twap_mid","mid_last"])
+
+#########################################
+#########################################
+
+class Bars(object):
+
+    """
+    Bars of an MBP-1 universe (with mid, sorted by ts_event) at several frequencies, merged and partitioned by freq
+    """
+
+    def __init__(self,universe:Table,freqs:typing.List[str]=FREQS,by:typing.List[str]=["symbol"]) -> None:
+
+        self._freqs = freqs
+        base = 10**9
+
+        if not all([nanos(f) % base == 0 for f in freqs]):
+            raise ValueError("Frequencies must be multiples of 1s")
+
+        # Tick level inputs as formula columns: nothing is stored per tick (update_by reads them through)
+        ticks = universe.update_view(["__s = epochNanos(ts_event)","__len = 0L","__num = 0.0","__den = 0L","__mid = mid"])
+        trades = universe.where("action = `T`").update_view([
+            "__s = epochNanos(ts_event)",
+            "open = price",
+            "high = price",
+            "low = price",
+            "close = price",
+            "volume = (long)size",
+            "notional = price * size",
+            "trades = 1L"
+        ])
+
+        # One pass over the ticks, then every frequency from the 1s bars
+        quotes1s = _rollQuotes(ticks,by,base)
+        trades1s = _rollTrades(trades,by,base)
+
+        bars = []
+        for f in freqs:
+            quotes = quotes1s if nanos(f)==base else _rollQuotes(quotes1s,by,nanos(f))
+            trds = trades1s if nanos(f)==base else _rollTrades(trades1s,by,nanos(f))
+            bars.append(_output(quotes,trds,by,f))
+
+        self._table = merge(bars)
+        self._partitioned = self._table.partition_by("freq")
+
+    @property
+    def freqs(self) -> typing.List[str]:
+        return self._freqs
+
+    @property
+    def table(self) -> Table:
+        return self._table
+
+    @property
+    def partitioned(self) -> PartitionedTable:
+        return self._partitioned
+
+    def get(self,freq:str) -> Table:
+        return self._partitioned.get_constituent([freq])
+
+    def write(self,root:str) -> None:
+
+        """
+        One parquet partition per frequency (root/freq=1m/), static universes only
+        """
+
+        for f in self._freqs:
+            pth = os.path.join(root,f"freq={f}","part.parquet")
+            os.makedirs(os.path.dirname(pth),exist_ok=True)
+            dhpq.write(self.get(f).drop_columns(["freq"]),pth)
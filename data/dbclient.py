@@ -1,21 +1,29 @@
+from __future__ import annotations
+
 import os
 import typing
+import hashlib
+import datetime
 
-import pandas as pd
 import numpy as np
 
-import deephaven.pandas as dhpd
 import deephaven.parquet as dhpq
 
 from deephaven.table import Table
-from deephaven import new_table
+from deephaven import new_table,empty_table,agg
+from deephaven import calendar as dhcal
 from deephaven.column import long_col,double_col
-
-import databento as db
+from deephaven.updateby import cum_sum
 
 import utils
+import lazy
 from . import Client
 
+# pandas only for the databento files and the feeds: not imported by headless jobs that only read parquet
+pd = lazy.module("pandas")
+dhpd = lazy.module("deephaven.pandas")
+db = lazy.module("databento")
+
 def dbn2df(path:str) -> pd.DataFrame:
 
     df = db.DBNStore.from_file(path).to_df()
@@ -38,6 +46,44 @@ def dbn2df(path:str) -> pd.DataFrame:
 #########################################
 #########################################
 
+# Regular session in minutes from midnight ET
+SESSION_OPEN = 570
+SESSION_MINUTES = 390
+
+def timeBuckets(t:Table) -> Table:
+
+    """
+    ET date, minute of the session (from the open, negative before), hour and regular session flag of ts_event,
+    as formula columns: nothing is stored per row, analyses filter and join on the integers
+    """
+
+    if "minute_et" in t.column_names:
+        return t
+
+    t = t.update_view([
+        "date_et = ts_event.atZone('ET').toLocalDate()",
+        f"minute_et = (int)(ts_event.atZone('ET').toLocalTime().toSecondOfDay() / 60) - {SESSION_OPEN}",
+        f"hour_et = (int)((minute_et + {SESSION_OPEN}) / 60)",
+        f"rth = minute_et >= 0 && minute_et < {SESSION_MINUTES}"
+    ])
+
+    return t
+
+def timeOfDay() -> Table:
+
+    """
+    minute_et -> minute and hour (LocalTime), for joining the time of day on the integer buckets
+    """
+
+    return empty_table(24*60).update([
+        f"minute_et = (int)i - {SESSION_OPEN}",
+        "minute = java.time.LocalTime.ofSecondOfDay(60L*i)",
+        "hour = java.time.LocalTime.ofSecondOfDay(3600L*(int)(i/60))"
+    ])
+
+#########################################
+#########################################
+
 class DBHClient(Client):
 
     def __init__(self, root="data/") -> None:
@@ -45,6 +91,8 @@ class DBHClient(Client):
         self._dbroot = os.path.join(self._root,"db")
         self.get_feeds()
         self._feeds.publisher_id = self._feeds.publisher_id.astype(np.int32)
+        self._calendar = None
+        self._calendar_span = None
 
     @property
     def dbroot(self) -> str:
@@ -67,8 +115,85 @@ class DBHClient(Client):
         rec = next(self.lsbatch().where(f"jobid = `{jobid}`").iter_dict())
         return self.readDBN(rec["filename"])
 
-    def readTable(self,tablename:str) -> Table:
-        return dhpq.read(os.path.join(self._dbroot,tablename))
+    def readTable(self,tablename:str,filters:typing.List[str]=[],buckets:bool=False) -> Table:
+
+        """
+        buckets: add the time bucket columns (timeBuckets) after the filters, for the tables the analyses bucket by
+        time of day
+        """
+
+        t = dhpq.read(os.path.join(self._dbroot,tablename))
+
+        if len(filters)>0:
+            t = t.where(filters)
+
+        return timeBuckets(t) if buckets else t
+
+    def tableVersion(self,tablename:str,date:str|None=None) -> str:
+
+        """
+        Hash of the paths, sizes and modification times of the parquet files of a table: changes when files are
+        added, replaced or rewritten. With a date (YYYY-MM-DD), only the files whose path has the date in it; when
+        the layout is not split by date, the row count and last ts_event of the date (ET) in the data
+        """
+
+        root = os.path.join(self._dbroot,tablename)
+        files = sorted([os.path.join(d,f) for d,_,fs in os.walk(root) for f in fs if f.endswith(".parquet")]) if os.path.isdir(root) else [root]
+
+        if date is not None:
+            files = [f for f in files if (date in os.path.relpath(f,root)) or (date.replace("-","") in os.path.relpath(f,root))]
+            if len(files)==0:
+                return self._dataVersion(tablename,date)
+
+        h = hashlib.sha1()
+        for f in files:
+            st = os.stat(f)
+            h.update(f"{os.path.relpath(f,root)}:{st.st_size}:{st.st_mtime_ns};".encode())
+
+        return h.hexdigest()[:16]
+
+    def _dataVersion(self,tablename:str,date:str) -> str:
+
+        nxt = (datetime.date.fromisoformat(date) + datetime.timedelta(days=1)).isoformat()
+
+        t = self.readTable(tablename,[f"ts_event >= '{date}T00:00:00 ET'",f"ts_event < '{nxt}T00:00:00 ET'"])
+        v = next(t.agg_by([agg.count_("n"),agg.max_("last = ts_event")]).update_view("last = String.valueOf(last)").iter_dict(),None)
+
+        return f"{v['n']}:{v['last']}" if v is not None else "0"
+
+    def calendar(self,start:str|None=None,end:str|None=None) -> Table:
+
+        """
+        Trading calendar (cached): date, business, bday = number of business dates up to and including date.
+        Covers start..end (YYYY-MM-DD, e.g. the dates of the data) within the valid range of the default business
+        calendar, by default the whole valid range. The cache grows to cover later requests
+        """
+
+        cal = dhcal.calendar()
+        first,last = str(cal.firstValidDate()),str(cal.lastValidDate())
+
+        start = max(start or first,first)
+        end = min(end or last,last)
+
+        if self._calendar_span is not None:
+            if (self._calendar_span[0]<=start) and (end<=self._calendar_span[1]):
+                return self._calendar
+            start,end = min(start,self._calendar_span[0]),max(end,self._calendar_span[1])
+
+        ndays = max(0,(datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days + 1)
+
+        tbl = empty_table(ndays).update([
+            f"date = parseLocalDate(`{start}`).plusDays(i)",
+            "business = isBusinessDay(date)",
+            "__bus = business ? 1 : 0"
+        ])
+
+        tbl = tbl.update_by(cum_sum("__bday = __bus")).update("bday = (int)__bday")
+
+        self._calendar = tbl.select(["date","business","bday"])
+        self._calendar_span = (start,end)
+
+        return self._calendar
 
     #############################################################
 
@@ -109,9 +234,21 @@ class DBHClient(Client):
 
         opts = opts.update([
             "expiry = expiration.atZone('UTC').toLocalDate()",
-            "days2expiry = numberBusinessDates(ts_event,expiration) - 1"
+            "__d0 = ts_event.atZone('ET').toLocalDate()",
+            "__d1 = expiration.atZone('ET').toLocalDate()"
         ])
 
+        # Business dates in [d0,d1] from the calendar index, same as numberBusinessDates. The calendar spans the
+        # dates of the definitions (NULL days2expiry outside the valid range of the business calendar)
+        span = opts.agg_by([agg.min_("__lo = __d0"),agg.max_("__hi = __d1")])
+        span = next(span.update_view(["__lo = String.valueOf(__lo)","__hi = String.valueOf(__hi)"]).iter_dict(),None)
+        cal = self.calendar(span["__lo"],span["__hi"]) if (span is not None) and (span["__lo"]!="null") else self.calendar()
+        opts = opts.natural_join(cal,on="__d0 = date",joins=["__b0 = bday","__bus0 = business"])
+        opts = opts.natural_join(cal,on="__d1 = date",joins=["__b1 = bday"])
+
+        opts = opts.update("days2expiry = (isNull(__b0) || isNull(__b1)) ? NULL_INT : __b1 - __b0 + (__bus0 ? 1 : 0) - 1")
+        opts = opts.drop_columns(["__d0","__d1","__b0","__bus0","__b1"])
+
         opts = opts.sort("expiry")
 
         return opts.move_columns_up(["underlying","expiry","days2expiry"])
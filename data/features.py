@@ -0,0 +1,146 @@
+"""
+Order book features of MBP-1 universes (with mid, sorted by ts_event). Each feature adds the bucketed value <name>
+and the price forecast forecast_<name> used by MBP1.analyzeEvents. All the selected features are computed together:
+one update_view for the inputs, one update_by per symbol for the tick differences (only when a feature needs them),
+one for the windowed quantities and one update for the outputs, so the cost does not grow with a pass per feature
+and ticking universes tick through.
+
+Directional features forecast a price change; state features (spread, volatility) forecast with the microprice
+offset, so analyzeEvents per state bucket measures how well the book predicts the move in that state
+"""
+
+import typing
+
+from deephaven.table import Table
+from deephaven.updateby import UpdateByOperation,rolling_sum_time,emstd_time,delta
+
+# Inputs shared by the features: spread, top of book size imbalance in [-1,1] and microprice
+COMMON = [
+    "__spread = ask_px_00 - bid_px_00",
+    "__imb = (bid_sz_00 - ask_sz_00) / (double)(bid_sz_00 + ask_sz_00)",
+    "__micro = mid + 0.5 * __spread * __imb"
+]
+
+TICK = 0.01
+
+def bucket(x:str,scale:float,cap:int) -> str:
+
+    """
+    Integer bucket round(scale*x) clipped to [-cap,cap], NULL_INT for missing values
+    """
+
+    return f"(isNull(({x})) || isNaN(({x}))) ? NULL_INT : (int)max(-{cap},min({cap},round({scale}*({x}))))"
+
+class Feature(object):
+
+    """
+    pre: formulas of the update_by inputs, diffs: update_by operations on the previous tick (run before ops),
+    ops: update_by operations, post: formulas of <name> and forecast_<name>. Temporary columns are named __<name>_*
+    """
+
+    def __init__(self,name:str,pre:typing.List[str]=[],ops:typing.List[UpdateByOperation]=[],post:typing.List[str]=[],diffs:typing.List[UpdateByOperation]=[]) -> None:
+        self.name = name
+        self.pre = pre
+        self.diffs = diffs
+        self.ops = ops
+        self.post = post
+
+#########################################
+#########################################
+
+def imbalance(name:str="imbalance",levels:int=5) -> Feature:
+
+    """
+    Top of book size imbalance in 2*levels+1 buckets, forecast as the bucket's fraction of the half spread
+    """
+
+    return Feature(name,post=[f"{name} = {bucket('__imb',levels,levels)}",f"forecast_{name} = 0.5 * __spread * {name} / {levels}"])
+
+def microprice(name:str="microprice",tick:float=TICK,cap:int=5) -> Feature:
+
+    """
+    Microprice offset from the mid in ticks, forecast by the (unbucketed) offset
+    """
+
+    return Feature(name,post=[f"{name} = {bucket('__micro - mid',1/tick,cap)}",f"forecast_{name} = __micro - mid"])
+
+def spread(name:str="spread",tick:float=TICK,cap:int=5) -> Feature:
+
+    """
+    Spread state in ticks (cap and above in the last bucket). State feature: microprice offset forecast
+    """
+
+    return Feature(name,post=[f"{name} = {bucket('__spread',1/tick,cap)}",f"forecast_{name} = __micro - mid"])
+
+def flow(name:str="flow",window:str="PT10s",levels:int=5) -> Feature:
+
+    """
+    Trade flow imbalance: signed over total traded size in the trailing window (sign implied from the quote),
+    forecast as a fraction of the half spread
+    """
+
+    return Feature(name,
+        pre=[
+            f"__{name}_v = action==`T` ? (double)size : 0.0",
+            f"__{name}_sv = price>=ask_px_00 ? __{name}_v : (price<=bid_px_00 ? -__{name}_v : 0.0)"
+        ],
+        ops=[rolling_sum_time(ts_col="ts_event",cols=[f"__{name}_v",f"__{name}_sv"],rev_time=window)],
+        post=[
+            f"__{name}_x = __{name}_v > 0 ? __{name}_sv / __{name}_v : 0.0",
+            f"{name} = {bucket(f'__{name}_x',levels,levels)}",
+            f"forecast_{name} = 0.5 * __spread * __{name}_x"
+        ])
+
+def volatility(name:str="volatility",decay:str="PT1m",tick:float=TICK,cap:int=10) -> Feature:
+
+    """
+    EWMA standard deviation of the tick to tick mid changes over the decay time, in quarter ticks. State feature:
+    microprice offset forecast
+    """
+
+    return Feature(name,
+        diffs=[delta(f"__{name}_dmid = mid")],
+        ops=[emstd_time(ts_col="ts_event",decay_time=decay,cols=[f"__{name}_sd = __{name}_dmid"])],
+        post=[f"{name} = {bucket(f'__{name}_sd',4/tick,cap)}",f"forecast_{name} = __micro - mid"])
+
+DEFAULT = [imbalance(),microprice(),spread(),flow(),volatility()]
+
+#########################################
+#########################################
+
+def compute(universe:Table,features:typing.List[Feature]=DEFAULT,by:typing.List[str]=["symbol"]) -> Table:
+
+    names = [f.name for f in features]
+    if len(set(names))<len(names):
+        raise ValueError(f"Duplicate feature names: {names}")
+
+    t = universe.update_view(COMMON + [p for f in features for p in f.pre])
+
+    # Differences to the previous tick feed the windowed quantities: their own pass, only if needed
+    diffs = [o for f in features for o in f.diffs]
+    if len(diffs)>0:
+        t = t.update_by(diffs,by=by)
+
+    # All the windowed quantities in a single pass
+    ops = [o for f in features for o in f.ops]
+    if len(ops)>0:
+        t = t.update_by(ops,by=by)
+
+    t = t.update([p for f in features for p in f.post])
+    return t.drop_columns([c for c in t.column_names if c.startswith("__")])
+
+def hook(mbp1) -> Table:
+
+    """
+    Study hook (data.features:hook): the universe with the default features
+    """
+
+    return compute(mbp1.universe)
+
+def events(mbp1) -> Table:
+
+    """
+    Study hook for analyzeEvents (data.features:events): the trades with the default features
+    """
+
+    return hook(mbp1).where("action = `T`")
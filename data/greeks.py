@@ -0,0 +1,148 @@
+"""
+Black-76 / Black-Scholes implied volatility and greeks, vectorized over whole columns of option trades. The
+underlying mid S is turned into the forward F = S*exp((r-q)T) and prices are discounted with exp(-rT); implied
+vols are solved for all the trades at once by Newton steps safeguarded by bisection
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+# Time to expiry: business days plus the remaining fraction of the session, in years
+DAYS_PER_YEAR = 252
+SESSION_CLOSE = 16.0
+SESSION_HOURS = 6.5
+MIN_T = 1.0 / (DAYS_PER_YEAR * 390)
+
+VOL_LO = 1e-4
+VOL_HI = 5.0
+
+def ncdf(x:np.ndarray) -> np.ndarray:
+
+    """
+    Standard normal cdf (erfc Chebyshev fit, relative error < 1.2e-7)
+    """
+
+    z = np.abs(x) / np.sqrt(2)
+    t = 1.0 / (1.0 + 0.5*z)
+    p = -z*z - 1.26551223 + t*(1.00002368 + t*(0.37409196 + t*(0.09678418 + t*(-0.18628806 + t*(0.27886807 + t*(-1.13520398 + t*(1.48851587 + t*(-0.82215223 + t*0.17087277))))))))
+    erfc = t * np.exp(p)
+
+    return np.where(x>=0,1.0 - 0.5*erfc,0.5*erfc)
+
+def npdf(x:np.ndarray) -> np.ndarray:
+    return np.exp(-0.5*x*x) / np.sqrt(2*np.pi)
+
+def d1(F:np.ndarray,K:np.ndarray,T:np.ndarray,vol:np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore",invalid="ignore"):
+        return (np.log(F/K) + 0.5*vol*vol*T) / (vol*np.sqrt(T))
+
+def black76(F:np.ndarray,K:np.ndarray,T:np.ndarray,vol:np.ndarray,call:np.ndarray,df:np.ndarray) -> np.ndarray:
+
+    """
+    Discounted price of calls (call=True) and puts on the forward
+    """
+
+    a = d1(F,K,T,vol)
+    b = a - vol*np.sqrt(T)
+
+    return df * np.where(call,F*ncdf(a) - K*ncdf(b),K*ncdf(-b) - F*ncdf(-a))
+
+def vega76(F:np.ndarray,K:np.ndarray,T:np.ndarray,vol:np.ndarray,df:np.ndarray) -> np.ndarray:
+    return df * F * npdf(d1(F,K,T,vol)) * np.sqrt(T)
+
+def impliedVol(px:np.ndarray,F:np.ndarray,K:np.ndarray,T:np.ndarray,call:np.ndarray,df:np.ndarray,tol:float=1e-6,maxiter:int=50) -> np.ndarray:
+
+    """
+    Implied vol of the prices px (to tol in vol), NaN where px is outside the no-arbitrage bounds
+    """
+
+    px,F,K,T,df = [np.asarray(x,dtype=np.float64) for x in [px,F,K,T,df]]
+    call = np.asarray(call,dtype=bool)
+
+    lo = black76(F,K,T,np.full_like(px,VOL_LO),call,df)
+    hi = black76(F,K,T,np.full_like(px,VOL_HI),call,df)
+
+    vol = np.full_like(px,np.nan)
+    ok = np.isfinite(px) & np.isfinite(F) & (px>=lo) & (px<=hi)
+
+    # Bracket and Newton iterate, only on the trades not yet converged
+    idx = np.flatnonzero(ok)
+    a = np.full(len(idx),VOL_LO)
+    b = np.full(len(idx),VOL_HI)
+    v = np.full(len(idx),0.3)
+
+    for _ in range(maxiter):
+
+        if len(idx)==0:
+            break
+
+        p,f,k,t,d,c = px[idx],F[idx],K[idx],T[idx],df[idx],call[idx]
+
+        diff = black76(f,k,t,v,c,d) - p
+        a = np.where(diff<0,v,a)
+        b = np.where(diff>0,v,b)
+
+        with np.errstate(divide="ignore",invalid="ignore"):
+            vn = v - diff / vega76(f,k,t,v,d)
+
+        # Bisect when the Newton step leaves the bracket
+        vn = np.where(np.isfinite(vn) & (vn>a) & (vn<b),vn,0.5*(a+b))
+
+        done = (np.abs(vn - v) < tol) | (b - a < tol)
+        vol[idx[done]] = vn[done]
+
+        keep = ~done
+        idx,a,b,v = idx[keep],a[keep],b[keep],vn[keep]
+
+    # Not converged: best estimate
+    vol[idx] = v
+
+    return vol
+
+def greeks(S:np.ndarray,K:np.ndarray,T:np.ndarray,vol:np.ndarray,call:np.ndarray,rate:float=0.0,dividend:float=0.0) -> typing.Dict[str,np.ndarray]:
+
+    """
+    Spot delta, gamma and vega (per 1.00 of vol) of calls and puts
+    """
+
+    qf = np.exp(-dividend*T)
+    F = S * np.exp((rate - dividend)*T)
+    a = d1(F,K,T,vol)
+
+    with np.errstate(divide="ignore",invalid="ignore"):
+        return {
+            "delta": qf * np.where(call,ncdf(a),ncdf(a) - 1.0),
+            "gamma": qf * npdf(a) / (S*vol*np.sqrt(T)),
+            "vega": S * qf * npdf(a) * np.sqrt(T)
+        }
+
+#########################################
+#########################################
+
+def yearFraction(ts:np.ndarray,days2expiry:np.ndarray) -> np.ndarray:
+
+    """
+    Time to expiry in years of trades at ts (epoch nanos), expiring at the close days2expiry business days later
+    """
+
+    et = pd.DatetimeIndex(pd.to_datetime(ts,unit="ns",utc=True)).tz_convert("America/New_York")
+    hours = et.hour.values + et.minute.values/60 + et.second.values/3600
+    left = np.clip((SESSION_CLOSE - hours) / SESSION_HOURS,0.0,1.0)
+
+    return np.maximum((days2expiry + left) / DAYS_PER_YEAR,MIN_T)
+
+def compute(ts:np.ndarray,px:np.ndarray,S:np.ndarray,K:np.ndarray,days2expiry:np.ndarray,call:np.ndarray,rate:float=0.0,dividend:float=0.0) -> typing.Dict[str,np.ndarray]:
+
+    """
+    Implied vol and greeks of option trades at price px, with underlying mid S
+    """
+
+    T = yearFraction(ts,days2expiry)
+    F = S * np.exp((rate - dividend)*T)
+    df = np.exp(-rate*T)
+
+    vol = impliedVol(px,F,K,T,call,df)
+
+    return {"iv":vol,**greeks(S,K,T,vol,call,rate,dividend)}
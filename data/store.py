@@ -0,0 +1,181 @@
+"""
+Persistent store of analysis results. A result is keyed by a hash of the study parameters and stored as parquet,
+one partition per date (root/<key>/data/date=YYYY-MM-DD/) next to a manifest (root/<key>/manifest.json). Each date records the version of the input data it was
+computed from: only missing dates, or dates whose inputs changed, are recomputed
+"""
+
+import os
+import json
+import time
+import shutil
+import typing
+import hashlib
+import functools
+
+import deephaven.parquet as dhpq
+from deephaven import new_table
+from deephaven.table import Table
+from deephaven.column import string_col,long_col,double_col
+
+class ResultStore(object):
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self,root:str="data/results",max_gb:float=50.0,max_age_days:float=90.0) -> None:
+        self._root = root
+        self._max_gb = max_gb
+        self._max_age_days = max_age_days
+        os.makedirs(root,exist_ok=True)
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    @staticmethod
+    def key(params:typing.Dict) -> str:
+        return hashlib.sha1(json.dumps(params,sort_keys=True,default=str).encode()).hexdigest()[:16]
+
+    def path(self,key:str) -> str:
+        return os.path.join(self._root,key)
+
+    def partition(self,key:str,date:str) -> str:
+        return os.path.join(self.path(key),"data",f"date={date}","part.parquet")
+
+    ##################################################
+
+    def manifest(self,key:str) -> typing.Dict:
+
+        pth = os.path.join(self.path(key),self.MANIFEST)
+        if not os.path.exists(pth):
+            return {"params":None,"created":time.time(),"accessed":time.time(),"dates":dict()}
+
+        with open(pth) as f:
+            return json.load(f)
+
+    def _writeManifest(self,key:str,mfst:typing.Dict) -> None:
+
+        os.makedirs(self.path(key),exist_ok=True)
+        pth = os.path.join(self.path(key),self.MANIFEST)
+
+        # Write then rename: a crash never leaves a truncated manifest
+        with open(pth + ".tmp","w") as f:
+            json.dump(mfst,f,indent=1)
+        os.replace(pth + ".tmp",pth)
+
+    def missing(self,key:str,dates:typing.List[str],version:typing.Callable[[str],str]|None=None) -> typing.List[str]:
+
+        """
+        Dates not stored yet or stored from a different version of the inputs
+        """
+
+        stored = self.manifest(key)["dates"]
+        return [d for d in dates if (not d in stored) or ((version is not None) and (stored[d]!=version(d)))]
+
+    def put(self,key:str,date:str,t:Table,version:str="",params:typing.Dict|None=None) -> None:
+
+        pth = self.partition(key,date)
+
+        # Write then rename: a failed write keeps the previous result. Empty dates are only recorded in the manifest
+        if t.size>0:
+            os.makedirs(os.path.dirname(pth),exist_ok=True)
+            dhpq.write(t,pth + ".tmp")
+            os.replace(pth + ".tmp",pth)
+        elif os.path.exists(pth):
+            os.remove(pth)
+
+        mfst = self.manifest(key)
+        if params is not None:
+            mfst["params"] = params
+        mfst["dates"][date] = version
+        self._writeManifest(key,mfst)
+
+    def compute(self,key:str,dates:typing.List[str],fn:typing.Callable[[str],Table],version:typing.Callable[[str],str]|None=None,params:typing.Dict|None=None) -> Table:
+
+        """
+        Compute and store the missing dates with fn(date), then load all of dates
+        """
+
+        # Versions can be costly (they look at the input data): once per date
+        if version is not None:
+            version = functools.cache(version)
+
+        for d in self.missing(key,dates,version):
+            print(f"[+] Computing {key} {d}")
+            self.put(key,d,fn(d),version(d) if version is not None else "",params)
+
+        self.evict(keep=[key])
+        return self.load(key,dates)
+
+    def load(self,key:str,dates:typing.List[str]|None=None) -> Table:
+
+        """
+        Stored result (all dates, or the given ones), e.g. OpraFeatGui.fetch(store.load,key)
+        """
+
+        mfst = self.manifest(key)
+        if not any([os.path.exists(self.partition(key,d)) for d in mfst["dates"]]):
+            raise ValueError(f"No stored results for {key}")
+
+        mfst["accessed"] = time.time()
+        self._writeManifest(key,mfst)
+
+        t = dhpq.read(os.path.join(self.path(key),"data"))
+        if dates is not None:
+            # The type of the partitioning column is inferred from the directory names
+            t = t.update_view("__date = String.valueOf(date)").where_in(new_table([string_col("__date",dates)]),cols="__date").drop_columns(["__date"])
+
+        return t
+
+    ##################################################
+
+    def sizeGB(self,key:str) -> float:
+
+        total = 0
+        for dirpath,dirnames,filenames in os.walk(self.path(key)):
+            total += sum([os.path.getsize(os.path.join(dirpath,f)) for f in filenames])
+
+        return total / 1024**3
+
+    def keys(self) -> typing.List[str]:
+        return [k for k in os.listdir(self._root) if os.path.exists(os.path.join(self.path(k),self.MANIFEST))]
+
+    def ls(self) -> Table:
+
+        keys = self.keys()
+        mfsts = [self.manifest(k) for k in keys]
+
+        return new_table([
+            string_col("key",keys),
+            string_col("params",[json.dumps(m["params"],sort_keys=True) for m in mfsts]),
+            long_col("num_dates",[len(m["dates"]) for m in mfsts]),
+            string_col("first_date",[min(m["dates"]) if len(m["dates"])>0 else "" for m in mfsts]),
+            string_col("last_date",[max(m["dates"]) if len(m["dates"])>0 else "" for m in mfsts]),
+            double_col("size_gb",[self.sizeGB(k) for k in keys]),
+            double_col("age_days",[(time.time() - m["accessed"]) / 86400 for m in mfsts])
+        ])
+
+    def delete(self,key:str) -> None:
+        shutil.rmtree(self.path(key),ignore_errors=True)
+
+    def evict(self,keep:typing.List[str]=[]) -> typing.List[str]:
+
+        """
+        Delete results not accessed for max_age_days, then the least recently accessed ones until the store fits max_gb
+        """
+
+        accessed = {k:self.manifest(k)["accessed"] for k in self.keys() if not k in keep}
+        evicted = [k for k,t in accessed.items() if (time.time() - t) / 86400 > self._max_age_days]
+
+        sizes = {k:self.sizeGB(k) for k in self.keys() if not k in evicted}
+        total = sum(sizes.values())
+        for k in sorted([k for k in accessed if not k in evicted],key=lambda k:accessed[k]):
+            if total<=self._max_gb:
+                break
+            evicted.append(k)
+            total -= sizes[k]
+
+        for k in evicted:
+            print(f"[+] Evicting {k}")
+            self.delete(k)
+
+        return evicted
@@ -2,7 +2,10 @@
 Define utils that are used in DQL query scope
 """
 
+import typing
+
 import numpy as np
+import numpy.typing as npt
 
 def rndString(*choices) -> str:
     return np.random.choice(choices)
@@ -11,4 +14,23 @@ def rndInt(*choices) -> np.int32:
     return np.random.choice(choices)
 
 def rndUnif(*params) -> float:
-    return np.random.uniform(params[0],params[1])
\ No newline at end of file
+    return np.random.uniform(params[0],params[1])
+
+# Sketch query functions (see sketch.py). sketch imports deephaven: loaded on first call, so that globalscope can be
+# imported before the JVM is started
+
+def sketchQuantile(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64],q:float) -> float:
+    import sketch
+    return sketch.sketchQuantile(bkt,cnt,q)
+
+def sketchCdf(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64],x:float) -> float:
+    import sketch
+    return sketch.sketchCdf(bkt,cnt,x)
+
+def sketchCount(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64]) -> int:
+    import sketch
+    return sketch.sketchCount(bkt,cnt)
+
+def sketchHistogram(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64],edges:typing.Sequence[float]) -> npt.NDArray[np.int64]:
+    import sketch
+    return sketch.sketchHistogram(bkt,cnt,edges)
@@ -0,0 +1,140 @@
+import typing
+import threading
+import collections
+import concurrent.futures
+
+from deephaven.table import Table
+
+def frozen(v) -> typing.Hashable:
+
+    """
+    Hashable version of (nested) dashboard state
+    """
+
+    if isinstance(v,dict):
+        return tuple(sorted([(k,frozen(x)) for k,x in v.items()]))
+    if isinstance(v,(list,tuple)):
+        return tuple([frozen(x) for x in v])
+
+    return v
+
+def estimateMB(value) -> float:
+
+    """
+    Rough footprint of the tables held in value: 8 bytes per cell
+    """
+
+    if isinstance(value,Table):
+        return value.size * len(value.column_names) * 8 / 1024**2
+    if isinstance(value,dict):
+        return sum([estimateMB(v) for v in value.values()])
+    if isinstance(value,(list,tuple)):
+        return sum([estimateMB(v) for v in value])
+
+    return 0.0
+
+class TableCache(object):
+
+    """
+    Registry of dashboard tables shared by all sessions. Entries held by a session (hold) are pinned and
+    reference counted; once the last holder lets go they stay around as LRU entries, bounded by number of
+    entries and estimated memory
+    """
+
+    def __init__(self,max_entries:int=32,max_mb:float=2048) -> None:
+        self._max_entries = max_entries
+        self._max_mb = max_mb
+        self._entries = collections.OrderedDict()
+        self._refs = collections.Counter()
+        self._pending = dict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def stats(self) -> typing.Dict:
+        return {
+            "entries": len(self._entries),
+            "pinned": len([k for k in self._entries if self._refs[k]>0]),
+            "mb": sum([mb for v,mb in self._entries.values()]),
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+    def get(self,key:typing.Hashable,factory:typing.Callable):
+
+        with self._lock:
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+            # Someone else is computing the same table: wait for it
+            fut = self._pending.get(key)
+            owner = fut is None
+            if owner:
+                fut = concurrent.futures.Future()
+                self._pending[key] = fut
+            else:
+                self._hits += 1
+
+        if not owner:
+            return fut.result()
+
+        # Compute outside of the lock: other sessions keep being served
+        try:
+            value = factory()
+        except BaseException as e:
+            with self._lock:
+                del(self._pending[key])
+            fut.set_exception(e)
+            raise
+
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = (value,estimateMB(value))
+            del(self._pending[key])
+            self._evict()
+
+        fut.set_result(value)
+        return value
+
+    def hold(self,key:typing.Hashable) -> typing.Callable[[],None]:
+
+        """
+        Pin an entry on behalf of a session. Returns the release callback (usable as a ui.use_effect cleanup)
+        """
+
+        with self._lock:
+            self._refs[key] += 1
+
+        return lambda:self.release(key)
+
+    def release(self,key:typing.Hashable) -> None:
+
+        with self._lock:
+            self._refs[key] -= 1
+            if self._refs[key]<=0:
+                del(self._refs[key])
+            self._evict()
+
+    def _evict(self) -> None:
+
+        # Least recently used first, pinned entries are never evicted
+        for key in list(self._entries.keys()):
+            if (len(self._entries)<=self._max_entries) and (sum([mb for v,mb in self._entries.values()])<=self._max_mb):
+                break
+            if self._refs[key]==0:
+                del(self._entries[key])
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if self._refs[k]==0]:
+                del(self._entries[key])
@@ -0,0 +1,128 @@
+import re
+import typing
+import threading
+
+from deephaven import ui,merge
+from deephaven.table import Table
+from deephaven.filters import PatternMode,pattern
+
+from . import selection
+
+class Catalog(object):
+
+    """
+    Distinct values of the filterable columns with their counts. Each column is scanned once, on first use,
+    and shared by all controls and sessions; on ticking data count_by is maintained incrementally by the engine
+    """
+
+    def __init__(self,data:Table,ctypes:typing.Dict[str,str]) -> None:
+        self._data = data
+        self._ctypes = ctypes
+        self._lock = threading.RLock()
+        self._counts = dict()
+        self._values = dict()
+        self._lists = dict()
+
+    def counts(self,col:str) -> Table:
+
+        with self._lock:
+            if not col in self._counts:
+                self._counts[col] = self._data.count_by("count",by=[col]).sort(col)
+
+        return self._counts[col]
+
+    def values(self,col:str) -> Table:
+
+        with self._lock:
+            if not col in self._values:
+                vals = self.counts(col).view([col])
+
+                match self._ctypes[col]:
+                    case "java.time.Duration":
+                        vals = vals.update_view(f"{col} = {col}.toString()")
+
+                self._values[col] = vals
+
+        return self._values[col]
+
+    def size(self,col:str) -> int:
+        return self.counts(col).size
+
+    def list(self,col:str) -> typing.List:
+
+        """
+        Distinct values pulled into python (kept for static data only)
+        """
+
+        if self._data.is_refreshing:
+            return [x[col] for x in self.values(col).iter_dict()]
+
+        with self._lock:
+            if not col in self._lists:
+                self._lists[col] = [x[col] for x in self.values(col).iter_dict()]
+
+        return self._lists[col]
+
+    def search(self,col:str,text:str,k:int=50,prefix:bool=False,include:typing.List|None=None) -> Table:
+
+        """
+        Top k distinct values by frequency matching text (case insensitive prefix or substring), after the values
+        in include (e.g. the current selection) whether they match or not
+        """
+
+        cnts = self.counts(col)
+
+        scol = col
+        if self._ctypes[col]!="java.lang.String":
+            cnts = cnts.update_view(f"__s = String.valueOf({col})")
+            scol = "__s"
+
+        if len(text)>0:
+            regex = "(?i)" + ("^" if prefix else "") + re.escape(text)
+            cnts = cnts.where(pattern(PatternMode.FIND,scol,regex))
+
+        res = cnts.sort_descending("count").head(k).view([col])
+
+        if (include is not None) and (len(include)>0) and selection.supported(self._ctypes[col]):
+            res = merge([selection.valuesTable(self._ctypes[col],col,include),res]).select_distinct(col)
+
+        match self._ctypes[col]:
+            case "java.time.Duration":
+                res = res.update_view(f"{col} = {col}.toString()")
+
+        return res
+
+@ui.component
+def searchPicker(cat:Catalog,col:str,selected:typing.List,on_change:typing.Callable[[typing.List],None],multiple:bool=False,k:int=50,clearable:bool=True):
+
+    """
+    Filter control for high cardinality columns: the server returns the top k matches of the search text.
+    clearable: offer a Clear button (not for columns that must stay constrained)
+    """
+
+    text,set_text = ui.use_state("")
+    prefix,set_prefix = ui.use_state(False)
+
+    # The selection is always listed, even when it is not among the top k matches
+    results = ui.use_memo(lambda:cat.search(col,text,k,prefix,include=selected),[text,prefix,tuple(selected)])
+
+    def pick(v) -> None:
+        if v is None:
+            return
+        if multiple:
+            on_change([x for x in selected if x!=v] if v in selected else selected + [v])
+        else:
+            on_change([v])
+
+    return ui.flex(
+        ui.flex(
+            ui.search_field(label=col,value=text,on_change=set_text),
+            ui.checkbox("Prefix",is_selected=prefix,on_change=set_prefix),
+            ui.action_button("Clear",on_press=lambda *_:on_change([]),is_disabled=len(selected)==0) if clearable else None,
+            direction="row",
+            align_items="end"
+        ),
+        ui.picker(results,label=f"{col}: top {k}",selected_key=None if multiple else (selected[0] if len(selected)>0 else None),on_change=pick),
+        ui.text(", ".join([str(x) for x in selected])) if multiple else None,
+        direction="column"
+    )
@@ -1,10 +1,23 @@
 import typing
+import itertools
 
 from deephaven import ui,agg,updateby
 from deephaven.table import Table
 
 import utils
-from . import traces
+import lazy
+import bootstrap
+from . import instrument
+from . import catalog
+from . import selection
+from . import cache
+from . import rollup
+from . import session
+from . import worker
+
+# Plotting is only loaded when a chart is drawn
+traces = lazy.module(__package__ + ".traces")
+live = lazy.module(__package__ + ".live")
 
 class Manager(object):
 
@@ -30,18 +43,11 @@ class Manager(object):
          l1[n] = v
          return l1
 
-    def selectDistinct(self,data:Table,col:str,typ:str) -> Table:
-
-        match typ:
-            case "java.time.Duration":
-                return data.select_distinct(col).sort(col).update(f"{col} = {col}.toString()")
-            case _:
-                return data.select_distinct(col).sort(col)
-
     def __init__(self,data:Table):
 
         self._data = data
         self._ctypes = { r["Name"]:r["DataType"] for r in data.meta_table.iter_dict() }
+        self._catalog = catalog.Catalog(data,self._ctypes)
 
         self._filterable = self.canFilter(data)
         self._constrained = self.mustConstrain()
@@ -51,27 +57,18 @@ class Manager(object):
         self._multiple_filters = [ f for f in self.multipleSelect() if (f in self._filterable) and (not f in self._constrained) ]
         self._single_filters = [f for f in self._filterable if not f in self._multiple_filters ]
 
-        # State management, assigned later upon dashboard rendering
-        self._chart_type = "NONE"
-        self._set_chart_type = lambda v:None
-
-        self._filter_values = {"None":"None"}
-        self._set_filter_values = lambda v:None
-
-        self._by_values = ["None"]
-        self._set_by_values = lambda v:None
-
-        self._plot_by = ["None"]
-        self._set_plot_by = lambda v:None
+        self._cube = None
+        self._sample = None
 
-        self._metric_values = ["None"]
-        self._set_metric_values = lambda v:None
+        # Recently computed tables, shared by all sessions
+        self._cache = cache.TableCache(**self.cacheLimits())
 
-        self._plot_traces = ["None"]
-        self._set_plot_traces = lambda v:None
+        # Background computations
+        self._worker = worker.Worker(**self.workerOptions())
 
-        self._modifiers = {"None":False}
-        self._set_modifiers = lambda v:None
+        # Stage timings
+        self._recorder = instrument.Recorder()
+        self._interactions = itertools.count(1)
     
     @classmethod
     def fetch(cls,callable:typing.Callable,*args,**kwargs):
@@ -91,6 +88,10 @@ class Manager(object):
     def ctypes(self) -> typing.Dict[str,str]:
         return self._ctypes
 
+    @property
+    def catalog(self) -> catalog.Catalog:
+        return self._catalog
+
     @property
     def filterable(self) -> typing.List[str]:
         return self._filterable
@@ -116,20 +117,12 @@ class Manager(object):
         return self._sortable
 
     @property
-    def chart_type(self) -> str:
-        return self._chart_type
-
-    @property
-    def filter_values(self) -> typing.Dict:
-        return self._filter_values
+    def cache(self) -> cache.TableCache:
+        return self._cache
 
     @property
-    def by_values(self) -> typing.List[str]:
-        return self._by_values
-
-    @property
-    def metric_values(self) -> typing.List[str]:
-        return self._metric_values
+    def performance(self) -> Table:
+        return self._recorder.stages
 
     ##########################################################
 
@@ -138,10 +131,10 @@ class Manager(object):
 
     def aggregations(self) -> typing.Dict:
         """
-        Definitions of allowed aggregations
+        Definitions of allowed aggregations: deephaven aggregations or rollup measures
         """
         return  {
-            "count": agg.count_("count"),
+            "count": rollup.count_("count"),
         }
 
     def derived(self) -> typing.Dict:
@@ -190,11 +183,127 @@ class Manager(object):
     def featureTraces(self,metrics:typing.List[str]) -> typing.List:
         return []
 
+    def maxChoices(self) -> int:
+        """
+        Columns with more distinct values than this get a search box returning the top matches by frequency
+        """
+        return 100
+
+    def liveSelection(self) -> bool:
+        """
+        Keep selected filter values in input tables: toggling values updates the filtered table in place
+        instead of building a new one
+        """
+        return False
+
+    def useRollup(self) -> bool:
+        """
+        Answer every filter + by combination from a cube pre-aggregated over cubeDimensions().
+        Requires all aggregations to be rollup measures or distributions
+        """
+        return False
+
+    def cubeDimensions(self) -> typing.List[str]:
+        """
+        Finest grain of the rollup cube: every filter and by column must be in here
+        """
+        return self.filterable
+
+    def previewSampling(self) -> int:
+        """
+        Preview mode computes on one row out of previewSampling() in every mustConstrain() stratum,
+        counts and sums are scaled up accordingly. 0 disables preview mode. Requires all aggregations to be rollup
+        measures or distributions
+        """
+        return 0
+
+    def bootstrapBlock(self) -> str|None:
+        """
+        Column of independent blocks (e.g. date): derived metrics of additive aggregations get block bootstrap
+        confidence intervals ({metric}_lo,{metric}_hi) in the aggregated table and as error bars. Static data only
+        """
+        return None
+
+    def cacheLimits(self) -> typing.Dict:
+        """
+        Bounds of the cache of filtered and aggregated tables
+        """
+        return {"max_entries":32,"max_mb":2048}
+
+    def chartWidth(self) -> int:
+        """
+        Width of the charts in pixels: timeseries are downsampled to about one point per pixel
+        """
+        return 1200
+
+    def maxRedrawRate(self) -> float:
+        """
+        Maximum redraws per second of plotly charts on ticking data
+        """
+        return 1.0
+
+    def workerOptions(self) -> typing.Dict:
+        """
+        Background executor: number of threads of the process wide pool (set by the first Manager) and debounce of
+        rapid state changes
+        """
+        return {"max_workers":4,"debounce_s":0.25}
+
+    def showPerformance(self) -> bool:
+        """
+        Show stage timings and the engine operations they ran in a "Performance" panel
+        """
+        return False
+
     ##############################################
     ##############################################
 
     ### Below typically not touched by user
 
+    ## Rollup cube (built once, incrementally maintained on ticking data)
+    def cube(self) -> Table:
+
+        if self._cube is None:
+
+            aggr = self.aggregations()
+            if not all([isinstance(a,(rollup.Measure,rollup.Sketch)) for a in aggr.values()]):
+                raise ValueError("Rollup mode requires all aggregations to be rollup measures or distributions")
+
+            dims = self.cubeDimensions()
+            measures = [a for a in aggr.values() if isinstance(a,rollup.Measure)]
+            sketches = [a for a in aggr.values() if isinstance(a,rollup.Sketch)]
+
+            pre = [f for m in measures for f in m.pre]
+            data = self._data.update_view(pre) if len(pre)>0 else self._data
+
+            cube = data.agg_by(aggs=[a for m in measures for a in m.cube],by=dims) if len(measures)>0 else data.select_distinct(dims)
+
+            # A sketch per cell, merged per group when the cube is re-aggregated
+            for sk in sketches:
+                cube = cube.natural_join(sk.table(data,dims),on=dims,joins=sk.columns)
+
+            self._cube = cube
+
+        return self._cube
+
+    ## Deterministic stratified sample for preview mode (the same rows every time)
+    def canPreview(self) -> bool:
+
+        # Only rollup measures say whether they scale with the sample: plain deephaven aggregations would show
+        # sums and counts of the sample unscaled
+        measures = all([isinstance(a,(rollup.Measure,rollup.Sketch)) for a in self.aggregations().values()])
+
+        return (self.previewSampling()>1) and (not self.useRollup()) and measures
+
+    def sample(self) -> Table:
+
+        if self._sample is None:
+            step = self.previewSampling()
+            self._sample = self._data.update_view("__one = 1").update_by(updateby.cum_sum("__n = __one"),by=self.mustConstrain())
+            self._sample = self._sample.where(f"(__n - 1) % {step} == 0").drop_columns(["__one","__n"])
+
+        return self._sample
+
     ## time-like columns (can be used in timeseries)
     def timeCols(self) -> typing.List[str]:
         return [ c for c,t in self.ctypes.items() if t in ["java.time.LocalDate","java.time.LocalTime"] ]
@@ -213,43 +322,53 @@ class Manager(object):
         return chrts
 
     ## Filtering
-    def filteringControls(self) -> typing.Dict:
+    def highCardinality(self,col:str) -> bool:
+        return self._catalog.size(col)>self.maxChoices()
+
+    def filteringControls(self,s:session.Session) -> typing.Dict:
+
+        # High cardinality columns get a server side search instead of the full list of values
+        search = lambda c,multiple: catalog.searchPicker(self._catalog,c,s.filter_values.get(c,[]),lambda v,x=c: s.set_filter_values({**s.filter_values,x:v}),multiple=multiple,k=self.maxChoices(),clearable=not c in self._constrained)
 
         # Filter buttons
         filter_buttons_single = [
 
-            ui.combo_box(self.selectDistinct(self.data,c,self.ctypes[c]),
+            search(c,False) if self.highCardinality(c) else
+            ui.combo_box(self._catalog.values(c),
                          key=c,
                          label=c,
-                         selected_key=self._filter_values.get(c),
-                         on_change=lambda v,x=c: self._set_filter_values({**self._filter_values,x:[v] if v is not None else []}))
+                         selected_key=s.filter_values.get(c),
+                         on_change=lambda v,x=c: s.set_filter_values({**s.filter_values,x:[v] if v is not None else []}))
 
             for c in self.free if not c in self.multiple_filters
         ]
 
         filter_buttons_single += [
-            ui.picker(self.selectDistinct(self.data,c,self.ctypes[c]),
+
+            search(c,False) if self.highCardinality(c) else
+            ui.picker(self._catalog.values(c),
                       key=c,
                       label=c,
-                      selected_key=self._filter_values.get(c),
-                      on_change=lambda v,x=c: self._set_filter_values({**self._filter_values,x:[v]}))
+                      selected_key=s.filter_values.get(c),
+                      on_change=lambda v,x=c: s.set_filter_values({**s.filter_values,x:[v]}))
 
             for c in self.constrained
         ]
 
         filter_buttons_multiple = [
 
-            ui.checkbox_group(*[x[c] for x in self.selectDistinct(self.data,c,self.ctypes[c]).iter_dict()],
+            search(c,True) if self.highCardinality(c) else
+            ui.checkbox_group(*self._catalog.list(c),
                               label=c,
-                              value=self._filter_values.get(c),
-                              on_change=lambda v,x=c: self._set_filter_values({**self._filter_values,x:v}),
+                              value=s.filter_values.get(c),
+                              on_change=lambda v,x=c: s.set_filter_values({**s.filter_values,x:v}),
                               orientation="horizontal")
 
             for c in self.multiple_filters
         ]
 
         # Clear all filters
-        clear = ui.button("Clear all filters",on_press=lambda b: self._set_filter_values({k:([] if k in self.free else v) for k,v in self._filter_values.items() }))
+        clear = ui.button("Clear all filters",on_press=lambda b: s.set_filter_values({k:([] if k in self.free else v) for k,v in s.filter_values.items() }))
 
         # Done
         return {
@@ -258,17 +377,31 @@ class Manager(object):
             "clear_button" : clear
         }
 
-    def filterTable(self,filter_values:typing.Dict,bys:typing.List[str]) -> typing.Dict:
+    def activeFilters(self,filter_values:typing.Dict,bys:typing.List[str]) -> typing.Dict:
 
-        # Do the filtering
         # Exclude "must constrain clauses if that clause is in a by"
         excl = [c for c in self.mustConstrain() if c in bys]
 
-        clauses = [self.formatClause(self.ctypes[x],x,filter_values[x]) for x in filter_values if (len(filter_values[x])>0) and (not x in excl)]
-        tfilt = self._data.where(clauses)
+        return {x:filter_values[x] for x in filter_values if (len(filter_values[x])>0) and (not x in excl)}
+
+    def filterClauses(self,filter_values:typing.Dict,bys:typing.List[str]) -> typing.List[str]:
+        return [self.formatClause(self.ctypes[x],x,vs) for x,vs in self.activeFilters(filter_values,bys).items()]
+
+    def filterTable(self,filter_values:typing.Dict,bys:typing.List[str],sel:selection.Selection|None=None,preview:bool=False) -> typing.Dict:
+
+        # Do the filtering: set membership against the selected values, no formula per selection
+        tfilt = self.cube() if self.useRollup() else (self.sample() if preview else self._data)
+        for x,vs in self.activeFilters(filter_values,bys).items():
+
+            if (sel is not None) and sel.has(x):
+                tfilt = tfilt.where_in(sel.table(x),cols=x)
+            elif selection.supported(self.ctypes[x]):
+                tfilt = tfilt.where_in(selection.valuesTable(self.ctypes[x],x,vs),cols=x)
+            else:
+                tfilt = tfilt.where(self.formatClause(self.ctypes[x],x,vs))
 
         return {
-            "filter_clauses" : clauses,
+            "filter_clauses" : self.filterClauses(filter_values,bys),
             "filtered_table" : tfilt
         }
 
@@ -305,7 +438,9 @@ class Manager(object):
 
     def metricChoices(self,chart_type:str) -> typing.Dict:
 
-        metrics = self.selectableMetrics(list(self.aggregations().keys()) + list(self.derived().keys()))
+        # Sketches are not plottable themselves, only the metrics derived from them
+        aggr = self.aggregations()
+        metrics = self.selectableMetrics([m for m,a in aggr.items() if not isinstance(a,rollup.Sketch)] + list(self.derived().keys()))
 
         match chart_type:
             case "bars":
@@ -327,49 +462,49 @@ class Manager(object):
                 raise ValueError("Chart type not implemented")
 
 
-    def aggregationControls(self) -> typing.Dict:
+    def aggregationControls(self,s:session.Session) -> typing.Dict:
 
         # By buttons
-        by_choices = self.byChoices(self._chart_type)
+        by_choices = self.byChoices(s.chart_type)
 
         by_buttons = [
-            ui.picker(*f,selected_key=self._by_values[i],on_change=lambda v,i=i:self._set_by_values(self.amendList(self._by_values,i,v)),label=k)
+            ui.picker(*f,selected_key=s.by_values[i],on_change=lambda v,i=i:s.set_by_values(self.amendList(s.by_values,i,v)),label=k)
             for i,(k,f) in enumerate(by_choices.items())
         ]
 
         # Aggregation metric buttons
-        metric_choices = self.metricChoices(self._chart_type)
+        metric_choices = self.metricChoices(s.chart_type)
 
         metric_buttons = []
-        if self._chart_type=="featurelines":
+        if s.chart_type=="featurelines":
             metric_buttons += [
                 ui.checkbox_group(
-                    *metric_choices["traces"],label="traces",value=self._metric_values,on_change=lambda v:self._setMetrics(v),orientation="horizontal"
+                    *metric_choices["traces"],label="traces",value=s.metric_values,on_change=lambda v:self._setMetrics(s,v),orientation="horizontal"
                 )
             ]
         else:
             metric_buttons += [
-                ui.picker(*m,selected_key=self._metric_values[i],on_change=lambda v,i=i:self._setMetrics(self.amendList(self._metric_values,i,v)),label=n)
+                ui.picker(*m,selected_key=s.metric_values[i],on_change=lambda v,i=i:self._setMetrics(s,self.amendList(s.metric_values,i,v)),label=n)
                 for i,(n,m) in enumerate(metric_choices.items())
             ]
 
         ## Modifiers
 
         # Cumulative button
-        cum = ui.checkbox("cumulative",is_selected=self._modifiers["cumulative"],on_change=lambda v:self._set_modifiers({**self._modifiers,"cumulative":v}))
+        cum = ui.checkbox("cumulative",is_selected=s.modifiers["cumulative"],on_change=lambda v:s.set_modifiers({**s.modifiers,"cumulative":v}))
 
         # Pivot button
-        pvt = ui.checkbox("pivot",is_selected=self._modifiers["pivot"],on_change=lambda v:self._set_modifiers({**self._modifiers,"pivot":v}))
+        pvt = ui.checkbox("pivot",is_selected=s.modifiers["pivot"],on_change=lambda v:s.set_modifiers({**s.modifiers,"pivot":v}))
 
         # Done
         return {
             "by_buttons" : by_buttons,
             "metric_button" : metric_buttons,
-            "cumulative_button" : cum if self._chart_type=="timeseries" else None,
-            "pivot_button" : pvt if ((self._chart_type=="featurelines") and (len(self._metric_values)==1) and (self._by_values[1]!="NONE")) else None
+            "cumulative_button" : cum if s.chart_type=="timeseries" else None,
+            "pivot_button" : pvt if ((s.chart_type=="featurelines") and (len(s.metric_values)==1) and (s.by_values[1]!="NONE")) else None
         }
 
-    def aggregateTable(self,tfilt:Table,chart_type:str,by_values:typing.List[str],metric_values:typing.List[str],modifiers:typing.Dict) -> Table:
+    def aggregateTable(self,tfilt:Table,chart_type:str,by_values:typing.List[str],metric_values:typing.List[str],modifiers:typing.Dict,preview:bool=False) -> Table:
 
         ## Find out which metrics we need to calculate
         aggr = self.aggregations()
@@ -387,16 +522,54 @@ class Manager(object):
                     calclist[dep] = aggr[dep]
                 dervlist.append(f"{m} = {derv[m][0]}")
 
+        # Sketches are computed on their own and joined by group
+        sketches = [a for a in calclist.values() if isinstance(a,rollup.Sketch)]
+        calclist = {m:a for m,a in calclist.items() if not isinstance(a,rollup.Sketch)}
+        if len(calclist)==0:
+            # Placeholder grouping; in rollup mode the cube has no row count to sum, its cells are counted
+            rows = rollup.count_("__rows")
+            calclist["__rows"] = rollup.Measure(rows.direct,[],[rows.direct]) if self.useRollup() else rows
+
         # Run aggregations
         byv = [b for b in by_values if b!="NONE"]
         srt = set([x for x in self.featureBuckets() + byv if (x in byv) and x in self.sortable])
 
-        tagg = tfilt.agg_by(aggs=list(calclist.values()),by=byv).sort(list(srt))
+        if self.useRollup():
+            # Re-aggregate the cube
+            tagg = tfilt.agg_by(aggs=[a for m in calclist.values() for a in m.merge],by=byv)
+            tagg = tagg.update([f for m in calclist.values() for f in m.post])
+            tagg = tagg.view(byv + list(calclist.keys())).sort(list(srt))
+        elif preview:
+            # Approximate: extensive measures scaled by the sampling rate, sample size next to them
+            step = self.previewSampling()
+            tagg = tfilt.agg_by(aggs=[rollup.direct(a) for a in calclist.values()] + [agg.count_("sample_size")],by=byv).sort(list(srt))
+            scaled = [f"{m} = {m} * {step}" for m,a in calclist.items() if rollup.extensive(a)]
+            if len(scaled)>0:
+                tagg = tagg.update(scaled)
+        else:
+            tagg = tfilt.agg_by(aggs=[rollup.direct(a) for a in calclist.values()],by=byv).sort(list(srt))
+
+        for sk in sketches:
+            tagg = tagg.natural_join(sk.merge(tfilt,byv) if self.useRollup() else sk.table(tfilt,byv),on=byv,joins=sk.columns)
 
         # Calculate derived stats if any
         if(len(dervlist)>0):
             tagg = tagg.update(dervlist)
 
+        tagg = tagg.drop_columns([c for sk in sketches for c in sk.columns] + (["__rows"] if "__rows" in calclist else []))
+
+        # Confidence intervals: additive statistics per block, resampled in numpy, drawn as error bars. Formulas
+        # outside the arithmetic subset of bootstrap.parse get no interval, nor do previews (the sample is not scaled)
+        # and cumulated or pivoted metrics
+        blk = None if (preview or modifiers["cumulative"] or modifiers["pivot"]) else self.bootstrapBlock()
+        boot = {m:derv[m][0] for m in metric_values if (m in derv) and all([rollup.extensive(aggr[d]) for d in derv[m][1]]) and bootstrap.supported(derv[m][0],derv[m][1])}
+
+        if (blk is not None) and (len(boot)>0) and (not blk in byv) and (not tfilt.is_refreshing) and ((not self.useRollup()) or (blk in self.cubeDimensions())):
+            stats = sorted(set([d for m in boot for d in derv[m][1]]))
+            tblk = tfilt.agg_by([a for d in stats for a in (aggr[d].merge if self.useRollup() else [aggr[d].direct])],by=byv + [blk])
+            ci = bootstrap.blockBootstrap(tblk,byv,blk,stats,boot)
+            tagg = tagg.natural_join(ci,on=byv,joins=[f"{m}_{x}" for m in boot for x in ["lo","hi"]])
+
         ## Apply modifiers
 
         # Cumulative
@@ -405,98 +578,200 @@ class Manager(object):
 
         # Pivot
         if modifiers["pivot"]:
-            pltby = [byv[0],byv[2]]
-            tagg = utils.pivot(tagg,pltby,byv[1],metric_values[0])
-            self._set_plot_by(pltby)
-            self._set_plot_traces([c for c in tagg.column_names if not c in pltby])
-        else:
-            self._set_plot_by(byv)
-            self._set_plot_traces(metric_values)
+            tagg = utils.pivot(tagg,[byv[0],byv[2]],byv[1],metric_values[0])
 
         # Done
         return tagg
 
+    def plotLayout(self,tagg:Table,by_values:typing.List[str],metric_values:typing.List[str],modifiers:typing.Dict) -> typing.Tuple[typing.List[str],typing.List[str]]:
+
+        """
+        Columns to plot by and traces of the aggregated table
+        """
+
+        byv = [b for b in by_values if b!="NONE"]
+
+        if modifiers["pivot"]:
+            pltby = [byv[0],byv[2]]
+            return pltby,[c for c in tagg.column_names if not c in pltby]
+
+        return byv,metric_values
+
     ## Charting
-    def _toggleChartType(self,chart_type:str):
+    def _toggleChartType(self,s:session.Session,chart_type:str):
 
-        self._set_chart_type(chart_type)
+        s.set_chart_type(chart_type)
 
-        self._set_by_values([v[0] for n,v in self.byChoices(chart_type).items()])
-        self._setMetrics([v[0] for n,v in self.metricChoices(chart_type).items()])
+        s.set_by_values([v[0] for n,v in self.byChoices(chart_type).items()])
+        self._setMetrics(s,[v[0] for n,v in self.metricChoices(chart_type).items()])
 
-        self._set_modifiers({"cumulative":False,"pivot":False})
+        s.set_modifiers({"cumulative":False,"pivot":False})
 
-    def _setMetrics(self,v):
+    def _setMetrics(self,s:session.Session,v):
 
         # Prevent from selecting zero traces
         if(len(v)==0):
             return
 
         # Pivot can select one trace only
-        if self._modifiers["pivot"]:
+        if s.modifiers["pivot"]:
             v = [v[-1]]
 
-        self._set_metric_values(v)
+        s.set_metric_values(v)
+
+    def defaults(self,chart_type:str|None=None) -> typing.Dict:
+
+        """
+        Initial dashboard state
+        """
+
+        chart_type = chart_type if chart_type is not None else self.chartTypes()[0]
+
+        mustcnstr = self.mustConstrain()
+        dflt:typing.Dict = {x:[] for x in self.filterable}
+        if len(mustcnstr)>0:
+            # Ticking data may not have rows yet
+            first = next(self._data.iter_dict(cols=mustcnstr),None)
+            if first is not None:
+                dflt.update( {k:[v] for k,v in first.items()} )
+
+        return {
+            "chart_type": chart_type,
+            "filter_values": dflt,
+            "by_values": [m[0] for n,m in self.byChoices(chart_type).items()],
+            "metric_values": [m[0] for n,m in self.metricChoices(chart_type).items()],
+            "modifiers": {"cumulative":False,"pivot":False},
+            "preview": self.canPreview()
+        }
 
     ######################################################################
 
-    def chartControls(self) -> typing.Dict:
+    def chartControls(self,s:session.Session) -> typing.Dict:
 
         # Graph type button
-        chart_button = ui.picker(*self.chartTypes(),selected_key=self._chart_type,on_change=lambda v:self._toggleChartType(str(v)),label="Chart type")
+        chart_button = ui.picker(*self.chartTypes(),selected_key=s.chart_type,on_change=lambda v:self._toggleChartType(s,str(v)),label="Chart type")
+
+        # Preview on a sample, or exact on all the data
+        preview_button = ui.checkbox(f"preview (1 in {self.previewSampling()} rows)",is_selected=s.preview,on_change=s.set_preview) if self.canPreview() else None
 
         return {
-            "chart_button": chart_button
+            "chart_button": chart_button,
+            "preview_button": preview_button
         }
 
     def chartTable(self,chart_type:str,tagg:Table,bys:typing.List[str],trcs:typing.List[str]):
 
+        # Plotly charts on ticking data follow the table updates
+        if tagg.is_refreshing:
+            match chart_type:
+                case "bars":
+                    return live.chart(tagg.view(bys + trcs[:1]),keys=bys,builder=lambda df:traces.barsFrame(df,bys,trcs[0]),max_rate=self.maxRedrawRate())
+                case "featurelines":
+                    lncnk,xc = traces.featurelinesTable(tagg,bys[:-1],bys[-1],trcs)
+                    return live.chart(lncnk,keys=[xc,bys[-1]],builder=lambda df:traces.featurelinesFrame(df,xc,bys[-1],trcs),max_rate=self.maxRedrawRate())
+
         match chart_type:
             case "bars":
                 return traces.bars(tagg,bys=bys,metric=trcs[0])
             case "lines":
                 return traces.lines(tagg,by=bys[0],mX=trcs[0],mY=trcs[1])
             case "timeseries":
-                return traces.timeseries(tagg,tc=bys[0],by=bys[1],metric=trcs[0])
+                return traces.timeseries(tagg,tc=bys[0],by=bys[1],metric=trcs[0],buckets=self.chartWidth() // 2)
             case "featurelines":
                 return traces.featurelines(tagg,bys=bys[:-1],feat=bys[-1],metrics=trcs)
             case _:
                 raise ValueError(f"Chart type:{chart_type} not implemented")
 
+    def compute(self,state:typing.Dict,fkey:typing.Hashable,akey:typing.Hashable,sel:selection.Selection|None=None) -> typing.Dict:
+
+        """
+        Filter -> aggregate -> chart for one dashboard state
+        """
+
+        interaction = next(self._interactions)
+        rec = self._recorder
+
+        filt = self._cache.get(fkey,lambda:rec.timed("filter",interaction,self._data,lambda:self.filterTable(state["filter_values"],state["by_values"],sel,state["preview"]),out=lambda r:r["filtered_table"]))
+        tagg = self._cache.get(akey,lambda:rec.timed("aggregate",interaction,filt["filtered_table"],lambda:self.aggregateTable(filt["filtered_table"],state["chart_type"],state["by_values"],state["metric_values"],state["modifiers"],state["preview"])))
+
+        plot_by,plot_traces = self.plotLayout(tagg,state["by_values"],state["metric_values"],state["modifiers"])
+        chrt = rec.timed("chart",interaction,tagg,lambda:self.chartTable(state["chart_type"],tagg,plot_by,plot_traces),out=lambda r:None)
+
+        return {
+            "keys": (fkey,akey),
+            "preview": state["preview"],
+            "filter": filt,
+            "aggregated_table": tagg,
+            "chart": chrt
+        }
+
     @ui.component
     def arrange(self):
 
-        # State management
-        self._chart_type,self._set_chart_type = ui.use_state(self.chartTypes()[0])
+        # State management: one session per viewer
+        s = session.Session(self.defaults())
+        sel = ui.use_memo(lambda:selection.Selection(self.ctypes,self.filterable) if self.liveSelection() else None,[])
 
-        mustcnstr = self.mustConstrain()
-        dflt:typing.Dict = {x:[] for x in self.filterable}
-        if len(mustcnstr)>0:
-            dflt.update( {k:[v] for k,v in next(self._data.iter_dict(cols=mustcnstr)).items()} )
+        # Controls
+        filtcntrl = self.filteringControls(s)
+        chrtcntrl = self.chartControls(s)
+        aggcntrl = self.aggregationControls(s)
+
+        # Filtering: with live selection the query only depends on which columns are filtered (and is not shared)
+        if self.liveSelection():
+            ui.use_effect(lambda:sel.set(s.filter_values),[s.filter_values])
+            fdeps = [tuple(self.activeFilters(s.filter_values,s.by_values).keys()),s.by_values,s.preview,sel.key]
+        else:
+            fdeps = [s.filter_values,s.by_values,s.preview]
 
-        self._filter_values,self._set_filter_values = ui.use_state(dflt)
+        fkey = ("filter",) + cache.frozen(fdeps)
+        akey = ("aggregate",) + cache.frozen(fdeps + [s.chart_type,s.metric_values,s.modifiers])
 
-        self._by_values,self._set_by_values = ui.use_state([m[0] for n,m in self.byChoices(self._chart_type).items()])
-        self._plot_by,self._set_plot_by = ui.use_state([v for v in self._by_values if not v=="NONE"])
+        # Computations run in the background: the previous result stays on screen until the new one is ready
+        result,set_result = ui.use_state(None)
+        status,set_status = ui.use_state("Updating...")
+        channel = ui.use_memo(lambda:worker.Channel(self._worker),[])
+        render_queue = ui.use_render_queue()
 
-        self._metric_values,self._set_metric_values = ui.use_state([m[0] for n,m in self.metricChoices(self._chart_type).items()])
-        self._plot_traces,self._set_plot_traces = ui.use_state(self._metric_values)
+        def done(r:typing.Dict) -> None:
+            render_queue(lambda:(set_result(r),set_status("")))
 
-        self._modifiers,self._set_modifiers = ui.use_state({"cumulative":False,"pivot":False})
+        def failed(e:BaseException) -> None:
+            render_queue(lambda:set_status(f"Error: {e}"))
 
-        # Controls
-        filtcntrl = self.filteringControls()
-        chrtcntrl = self.chartControls()
-        aggcntrl = self.aggregationControls()
+        def start():
+            set_status("Updating...")
+            channel.submit(lambda st=s.state():self.compute(st,fkey,akey,sel),done,failed)
+            return channel.cancel
+
+        ui.use_effect(start,[akey])
+
+        # Tables are shared across sessions through the registry, and held for as long as this session shows them
+        shown = result["keys"] if result is not None else ()
+
+        def hold():
+            releases = [self._cache.hold(k) for k in shown]
+            return lambda:[r() for r in releases]
+
+        ui.use_effect(hold,[shown])
 
-        # Filtering
-        filt = ui.use_memo(lambda:self.filterTable(self._filter_values,self._by_values),[self._filter_values,self._by_values])
+        filt = result["filter"] if result is not None else {"filtered_table":None}
+        tagg = result["aggregated_table"] if result is not None else None
+        chrt = result["chart"] if result is not None else None
+        rec = self._recorder
 
-        # Aggregations
-        tagg = ui.use_memo(lambda:self.aggregateTable(filt["filtered_table"],self._chart_type,self._by_values,self._metric_values,self._modifiers),[filt,self._chart_type,self._by_values,self._metric_values,self._modifiers])
+        # Approximate results are labelled as such, with a one click way to the exact ones
+        approx = (result is not None) and result["preview"]
+        preview_note = ui.flex(
+            ui.text(f"Preview: sampled 1 in {self.previewSampling()} rows" + (f" per {', '.join(self.mustConstrain())}" if len(self.mustConstrain())>0 else "") + ", counts and sums scaled up"),
+            ui.button("Exact",on_press=lambda b:s.set_preview(False))
+        ) if approx else None
 
-        # Charting
-        chrt = ui.use_memo(lambda:self.chartTable(self._chart_type,tagg,self._plot_by,self._plot_traces),[self._chart_type,tagg,self._plot_by,self._plot_traces])
+        # Performance
+        perf = [
+            ui.panel(ui.text("Cache: " + ", ".join([f"{k}={v:.0f}" for k,v in self._cache.stats().items()])),rec.stages,title="Performance"),
+            ui.panel(rec.engineLog(),title="Performance: engine operations")
+        ] if self.showPerformance() else []
 
         # Arrange
         return ui.column(
@@ -509,7 +784,7 @@ class Manager(object):
                              )
                         ),
                 ui.column(
-                    ui.panel(ui.flex(chrtcntrl["chart_button"]),
+                    ui.panel(ui.flex(chrtcntrl["chart_button"],chrtcntrl["preview_button"]),
                              ui.flex(*aggcntrl["by_buttons"],wrap="wrap"),
                              aggcntrl["cumulative_button"],
                              aggcntrl["pivot_button"],
@@ -519,9 +794,11 @@ class Manager(object):
             ),
             ui.row(
                 ui.stack(
-                    ui.panel(ui.text(" AND ".join(filt["filter_clauses"])),filt["filtered_table"],title="Filtered table"),
-                    ui.panel(tagg,title="Aggregated table"),
-                    ui.panel(chrt,title=f"Chart: {self._chart_type}"),height=60
+                    ui.panel(ui.text(status),ui.text(" AND ".join(self.filterClauses(s.filter_values,s.by_values))),filt["filtered_table"],title="Filtered table"),
+                    ui.panel(ui.text(status),preview_note,tagg,title="Aggregated table"),
+                    ui.panel(ui.text(status),preview_note,chrt,title=f"Chart: {s.chart_type}"),
+                    *perf,
+                    height=60
                 ),
                 height=60
             )
@@ -0,0 +1,75 @@
+import time
+import typing
+
+from deephaven import new_table,perfmon
+from deephaven.table import Table
+from deephaven.column import string_col,long_col,double_col
+from deephaven.constants import NULL_LONG
+from deephaven.stream import blink_to_append_only
+from deephaven.stream.table_publisher import table_publisher
+import deephaven.dtypes as dht
+
+class Recorder(object):
+
+    """
+    Records the duration and input/output sizes of dashboard stages into a ticking table
+    """
+
+    STAGES = {
+        "Timestamp": dht.Instant,
+        "End": dht.Instant,
+        "interaction": dht.int64,
+        "stage": dht.string,
+        "duration_ms": dht.double,
+        "rows_in": dht.int64,
+        "rows_out": dht.int64
+    }
+
+    def __init__(self,name:str="dashboard") -> None:
+        stages,self._publisher = table_publisher(name=f"{name}_performance",col_defs=self.STAGES)
+        self._stages = blink_to_append_only(stages)
+        self._engine_log = None
+
+    @property
+    def stages(self) -> Table:
+        return self._stages
+
+    def timed(self,stage:str,interaction:int,tin:Table,fn:typing.Callable,out:typing.Callable[[typing.Any],Table|None]=lambda r:r):
+
+        """
+        Run fn, record its duration. out extracts the output table from the result
+        """
+
+        t0 = time.time_ns()
+        res = fn()
+        t1 = time.time_ns()
+
+        tout = out(res)
+
+        row = new_table([
+            long_col("__t0",[t0]),
+            long_col("__t1",[t1]),
+            long_col("interaction",[interaction]),
+            string_col("stage",[stage]),
+            double_col("duration_ms",[(t1 - t0) / 1e6]),
+            long_col("rows_in",[tin.size]),
+            long_col("rows_out",[tout.size if isinstance(tout,Table) else NULL_LONG])
+        ])
+
+        row = row.update(["Timestamp = epochNanosToInstant(__t0)","End = epochNanosToInstant(__t1)"])
+        self._publisher.add(row.view(list(self.STAGES.keys())))
+
+        return res
+
+    def engineLog(self) -> Table:
+
+        """
+        Engine query operation log entries that started inside a recorded stage
+        """
+
+        if self._engine_log is None:
+            qopl = perfmon.query_operation_performance_log()
+            qopl = qopl.aj(self._stages,on=["StartTime>=Timestamp"],joins=["interaction","stage","stage_end = End"])
+            self._engine_log = qopl.where(["!isNull(stage)","StartTime <= stage_end"]).move_columns_up(["interaction","stage"])
+
+        return self._engine_log
@@ -0,0 +1,126 @@
+"""
+Plotly charts on ticking tables: a local copy of the aggregated table is maintained from the listener deltas
+and the figure is redrawn from it at a bounded rate
+"""
+
+import time
+import typing
+import threading
+
+import pandas as pd
+
+from deephaven import ui
+from deephaven.table import Table
+
+import plotly.graph_objects as go
+
+from . import traces
+
+class LiveFrame(object):
+
+    """
+    pandas copy of a keyed table (e.g. the output of agg_by), kept current from table updates. Starts empty and is
+    filled by the replay of the listener, so no update falls between the snapshot and the registration. At most
+    max_rows keys are kept: new keys beyond that are dropped
+    """
+
+    def __init__(self,t:Table,keys:typing.List[str],max_rows:int=traces.MAX_ROWS) -> None:
+        self._keys = keys
+        self._cols = t.column_names
+        self._max_rows = max_rows
+        self._lock = threading.Lock()
+        self._df = pd.DataFrame(columns=self._cols).set_index(keys,drop=False)
+        self.dropped = 0
+
+    def snapshot(self) -> pd.DataFrame:
+        with self._lock:
+            df = self._df.reset_index(drop=True)
+            df.attrs["total_rows"] = len(df) + self.dropped
+            return df
+
+    def apply(self,update) -> None:
+
+        removed = pd.DataFrame(update.removed(cols=self._keys))
+        changed = pd.concat([pd.DataFrame(update.added(cols=self._cols)),pd.DataFrame(update.modified(cols=self._cols))])
+
+        with self._lock:
+
+            df = self._df
+            if len(removed)>0:
+                df = df.drop(index=pd.MultiIndex.from_frame(removed) if len(self._keys)>1 else removed[self._keys[0]],errors="ignore")
+
+            # Upsert: existing keys are updated in place (row order is kept), new keys are appended
+            if len(changed)>0:
+                changed = changed.set_index(self._keys,drop=False)
+                changed = changed[~changed.index.duplicated(keep="last")]
+                exists = changed.index.isin(df.index)
+
+                df = df.copy()
+                df.loc[changed.index[exists],self._cols] = changed.loc[exists,self._cols]
+
+                new = changed[~exists]
+                room = max(0,self._max_rows - len(df))
+                self.dropped += max(0,len(new) - room)
+                new = new.iloc[:room]
+
+                df = new if len(df)==0 else pd.concat([df,new])
+
+            self._df = df
+
+class Throttle(object):
+
+    """
+    Runs fn at most max_rate times per second on a timer thread (never on the caller's thread, which is the
+    update graph listener); requests in between are coalesced into one call
+    """
+
+    def __init__(self,max_rate:float) -> None:
+        self._interval = 1.0 / max_rate
+        self._last = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def request(self,fn:typing.Callable[[],None]) -> None:
+
+        with self._lock:
+
+            if self._timer is not None:
+                return
+
+            wait = max(0.0,self._last + self._interval - time.monotonic())
+            self._timer = threading.Timer(wait,self._run,args=[fn])
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self,fn:typing.Callable[[],None]) -> None:
+
+        with self._lock:
+            self._timer = None
+            self._last = time.monotonic()
+
+        fn()
+
+@ui.component
+def chart(t:Table,keys:typing.List[str],builder:typing.Callable[[pd.DataFrame],go.Figure],max_rate:float=1.0):
+
+    frame = ui.use_memo(lambda:LiveFrame(t,keys),[t])
+    throttle = ui.use_memo(lambda:Throttle(max_rate),[max_rate])
+
+    fig,set_fig = ui.use_state(None)
+    render_queue = ui.use_render_queue()
+
+    def redraw() -> None:
+        fig = builder(frame.snapshot())
+        render_queue(lambda:set_fig(fig))
+
+    def onUpdate(update,is_replay:bool) -> None:
+        frame.apply(update)
+        throttle.request(redraw)
+
+    # The replay delivers the current rows to the empty frame, consistently with the updates that follow
+    ui.use_table_listener(t,onUpdate,[frame],do_replay=True)
+
+    # Also draw when there is nothing to replay (empty table)
+    ui.use_effect(lambda:throttle.request(redraw),[frame])
+
+    return fig if fig is not None else ui.text("Loading...")
@@ -1,28 +1,59 @@
 import typing
 
-from deephaven import empty_table,time_table,agg
 from deephaven.table import Table
 from deephaven.updateby import cum_sum
 from deephaven.appmode import ApplicationState, get_app_state
 
-from gui import dashboard
+from gui import dashboard,rollup
+import synthetic
+import warmup
 from globalscope import *
 
 class Example(dashboard.Manager):
 
+    def __init__(self,data:Table,ticker:synthetic.Ticker|None=None):
+        super().__init__(data)
+        self._ticker = ticker
+
+    @classmethod
+    def columns(cls,cardinalities:typing.Dict[str,int]={},extra_values:int=0) -> typing.Dict:
+        """
+        Generated columns: drawn in bulk by synthetic.Generator
+        """
+        cols = {
+            "cat1": synthetic.choice("a","b","c"),
+            "cat2": synthetic.choice("DD","EE","FF","GG"),
+            "cat3": synthetic.choice("fff","ggg","hhh","iii","lll"),
+            "n1": synthetic.choice(1,2,3,4),
+            "n2": synthetic.choice(10,20,30),
+            "value1": synthetic.uniform(0,1),
+            "__u2": synthetic.uniform(0,1),
+            "__u3": synthetic.uniform(0,1),
+            "__uObs": synthetic.uniform(-2.5,2.5)
+        }
+
+        # Override key cardinalities
+        for c,n in cardinalities.items():
+            vals = cols[c][1]
+            cols[c] = synthetic.keys(vals[0],n) if isinstance(vals[0],str) else synthetic.choice(*[vals[0]*(i+1) for i in range(n)])
+
+        # Additional value columns
+        cols.update({f"valueX{i}":synthetic.uniform(0,1) for i in range(extra_values)})
+
+        return cols
+
     @classmethod
     def random(cls,t:Table):
+
+        """
+        t must contain the generated columns
+        """
+
         t = t.update([
-            "cat1 = rndString(`a`,`b`,`c`)",
-            "cat2 = rndString(`DD`,`EE`,`FF`,`GG`)",
-            "cat3 = rndString(`fff`,`ggg`,`hhh`,`iii`,`lll`)",
-            "n1 = rndInt(1,2,3,4)",
-            "n2 = rndInt(10,20,30)",
-            "value1 = rndUnif(0,1)",
-            "value2 = n1 + rndUnif(0,1)",
-            "value3 = n2 + 10*n1*n1 + rndUnif(0,1)",
+            "value2 = n1 + __u2",
+            "value3 = n2 + 10*n1*n1 + __u3",
             "valuePred = 4*n1",
-            "valueObs = rndUnif(-2.5,2.5) + 4*n1",
+            "valueObs = __uObs + 4*n1",
             "date = '2025-01-01' + 'P1D' * (int)(i/10)",
             "idx = 1"
         ]
@@ -31,31 +62,58 @@ class Example(dashboard.Manager):
         # Add intraday (local) time types
         t = t.update_by(ops=[cum_sum(cols="idx")],by=["date"]).update(["minute = '09:29:00'.plusMinutes(idx)","second = '10:00:00'.plusSeconds(idx)"])
 
-        return t.drop_columns(["idx"])
+        return t.drop_columns(["idx","__u2","__u3","__uObs"])
 
     @classmethod
-    def static(cls,nrows:int=1000):
-        return cls(cls.random(empty_table(nrows)))
+    def static(cls,nrows:int=1000,seed:int=0):
+        return cls(cls.random(synthetic.Generator(seed).table(nrows,cls.columns())))
     
     @classmethod
-    def ticking(cls,period:str="PT1s"):
-        return cls(cls.random(time_table(period)))
+    def ticking(cls,period:str="PT1s",rows:int=1,seed:int=0):
+        ticker = synthetic.Ticker(cls.columns(),period=period,rows=rows,seed=seed)
+        return cls(cls.random(ticker.table),ticker=ticker)
+
+    @classmethod
+    def load(cls,rate:int=10000,batch:int=1000,cardinalities:typing.Dict[str,int]={},extra_values:int=0,seed:int=0):
+
+        """
+        Ticking example fed at a configurable rate. The lag of the data table and of the default
+        dashboard view is recorded in ticker.stats / ticker.summary()
+        """
+
+        ticker = synthetic.LoadGenerator(cls.columns(cardinalities,extra_values),rate=rate,batch=batch,seed=seed)
+        ex = cls(cls.random(ticker.table),ticker=ticker)
+
+        # Default dashboard view, recomputed on every cycle
+        st = ex.defaults()
+        filt = ex.filterTable(st["filter_values"],st["by_values"])
+        tagg = ex.aggregateTable(filt["filtered_table"],st["chart_type"],st["by_values"],st["metric_values"],st["modifiers"])
+
+        ticker.watch(ex.data,"data")
+        ticker.watch(tagg,"dashboard")
+
+        return ex
+
+    @property
+    def ticker(self) -> synthetic.Ticker|None:
+        return self._ticker
 
     def aggregations(self) -> typing.Dict:
         """
         Definitions of allowed aggregations
         """
         return  {
-            "count": agg.count_("count"),
-            "sum1": agg.sum_("sum1 = value1"),
-            "average1": agg.avg("average1 = value1"),
-            "average2": agg.avg("average2 = value2"),
-            "average3": agg.avg("average3 = value3"),
-            "valueObs": agg.avg("valueObs"),
-            "valuePred": agg.avg("valuePred"),
-            "sXY": agg.formula("sXY = sum(valuePred*valueObs)"),
-            "sXX": agg.formula("sXX = sum(valuePred*valuePred)"),
-            "sYY": agg.formula("sYY = sum(valueObs*valueObs)"),
+            "count": rollup.count_("count"),
+            "sum1": rollup.sum_("sum1","value1"),
+            "average1": rollup.avg("average1","value1"),
+            "average2": rollup.avg("average2","value2"),
+            "average3": rollup.avg("average3","value3"),
+            "valueObs": rollup.avg("valueObs"),
+            "valuePred": rollup.avg("valuePred"),
+            "sXY": rollup.sumOf("sXY","valuePred*valueObs"),
+            "sXX": rollup.sumOf("sXX","valuePred*valuePred"),
+            "sYY": rollup.sumOf("sYY","valueObs*valueObs"),
+            "dist1": rollup.distribution("dist1","value1")
         }
 
     def derived(self) -> typing.Dict:
@@ -66,7 +124,9 @@ class Example(dashboard.Manager):
         return {
             "ratio12" : ("average1/average2",["average1","average2"]),
             "beta"    : ("sXY/sXX",["sXY","sXX"]),
-            "r2"      : ("1 - (sXX + sYY - 2*sXY) / sYY",["sXX","sYY","sXY"])
+            "r2"      : ("1 - (sXX + sYY - 2*sXY) / sYY",["sXX","sYY","sXY"]),
+            "median1" : ("sketchQuantile(dist1_bkt,dist1_cnt,0.5)",["dist1"]),
+            "p90_1"   : ("sketchQuantile(dist1_bkt,dist1_cnt,0.9)",["dist1"])
         }
 
     def selectableMetrics(self, metriclist: typing.List[str]) -> typing.List[str]:
@@ -99,6 +159,9 @@ def make_static_example(nrows:int=100):
 def make_dynamic_example(period:str="PT1s"):
     return Example.ticking(period)
 
+def make_load_example(rate:int=10000,batch:int=1000,**kwargs):
+    return Example.load(rate,batch,**kwargs)
+
 ###################################################
 ###################################################
 
@@ -112,6 +175,9 @@ def initializeApp():
     static_data = st.data
     app["static"] = st.render()
 
+    # Compile the queries of the static dashboard before the first session (appstart.py)
+    warmup.declare({"quickstart.static": warmup.dashboards(lambda w:[st])})
+
     global dyn
     global ticking_data
 
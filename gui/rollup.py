@@ -0,0 +1,92 @@
+"""
+Mergeable measures for Manager.aggregations(): each one knows how to aggregate raw rows directly, how to
+aggregate them at the grain of a rollup cube, and how to re-aggregate the cube into the final value
+"""
+
+import typing
+
+from deephaven import agg
+from deephaven.agg import Aggregation
+from deephaven.table import Table
+
+import sketch
+
+class Measure(object):
+
+    def __init__(self,direct:Aggregation,cube:typing.List[Aggregation],merge:typing.List[Aggregation],post:typing.List[str]=[],extensive:bool=False,pre:typing.List[str]=[]) -> None:
+        self.direct = direct
+        self.cube = cube
+        self.merge = merge
+        self.post = post
+
+        # Columns the cube aggregations need (update_view of the raw rows)
+        self.pre = pre
+
+        # Grows with the number of rows (counts, sums): computed on a sample it has to be scaled up
+        self.extensive = extensive
+
+def direct(a:Aggregation|Measure) -> Aggregation:
+    return a.direct if isinstance(a,Measure) else a
+
+##############################################
+
+def count_(name:str) -> Measure:
+    return Measure(agg.count_(name),[agg.count_(name)],[agg.sum_(name)],extensive=True)
+
+def sum_(name:str,col:str|None=None) -> Measure:
+    a = agg.sum_(f"{name} = {col or name}")
+    return Measure(a,[a],[agg.sum_(name)],extensive=True)
+
+def sumOf(name:str,expr:str) -> Measure:
+    """
+    Sum of a formula of the columns, e.g. sumOf("sXY","x*y")
+    """
+    a = agg.formula(f"{name} = sum({expr})")
+    return Measure(a,[a],[agg.sum_(name)],extensive=True)
+
+def avg(name:str,col:str|None=None) -> Measure:
+    col = col or name
+    return Measure(agg.avg(f"{name} = {col}"),
+                   [agg.sum_(f"__{name}_num = {col}"),agg.count_where(f"__{name}_den",f"!isNull({col})")],
+                   [agg.sum_(f"__{name}_num"),agg.sum_(f"__{name}_den")],
+                   [f"{name} = __{name}_num / __{name}_den"])
+
+def weighted_avg(name:str,wcol:str,col:str|None=None) -> Measure:
+    col = col or name
+    # Like weighted_avg, the weights of rows without a value do not count
+    return Measure(agg.weighted_avg(wcol=wcol,cols=f"{name} = {col}"),
+                   [agg.weighted_sum(wcol=wcol,cols=f"__{name}_num = {col}"),agg.sum_(f"__{name}_den = __{name}_w")],
+                   [agg.sum_(f"__{name}_num"),agg.sum_(f"__{name}_den")],
+                   [f"{name} = __{name}_num / __{name}_den"],
+                   pre=[f"__{name}_w = isNull({col}) ? NULL_DOUBLE : (double){wcol}"])
+
+def extensive(a:Aggregation|Measure) -> bool:
+    return isinstance(a,Measure) and a.extensive
+
+##############################################
+
+class Sketch(object):
+
+    """
+    Approximate distribution (see sketch.py) of the raw values of col, or merge of the sketches already stored in
+    the data (col=None). Adds the {name}_bkt,{name}_cnt columns to the aggregated table, for use in derived metrics,
+    e.g. ("sketchQuantile(move_bkt,move_cnt,0.5)",["move"]) with the query functions of globalscope.
+    In rollup mode the cube stores a sketch per cell (table), re-aggregated with merge
+    """
+
+    def __init__(self,name:str,col:str|None=None) -> None:
+        self.name = name
+        self.col = col
+
+    @property
+    def columns(self) -> typing.List[str]:
+        return sketch.columns(self.name)
+
+    def table(self,t:Table,by:typing.List[str]) -> Table:
+        return sketch.sketchOf(t,self.col,by,self.name) if self.col is not None else sketch.mergeSketches(t,self.name,by)
+
+    def merge(self,cube:Table,by:typing.List[str]) -> Table:
+        return sketch.mergeSketches(cube,self.name,by)
+
+def distribution(name:str,col:str|None=None) -> Sketch:
+    return Sketch(name,col)
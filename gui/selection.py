@@ -0,0 +1,101 @@
+import uuid
+import typing
+
+from deephaven import new_table,input_table
+from deephaven.table import Table
+from deephaven.column import string_col,bool_col,byte_col,short_col,int_col,long_col,float_col,double_col
+import deephaven.dtypes as dht
+
+def toBool(v) -> bool:
+    # Values can come back from the UI as strings: bool("false") is True
+    return v if isinstance(v,bool) else str(v).lower()=="true"
+
+# Typed columns for the values selected in the dashboard controls
+COLUMNS = {
+    "java.lang.String": (string_col,str),
+    "java.lang.Boolean": (bool_col,toBool),
+    "byte": (byte_col,int),
+    "short": (short_col,int),
+    "int": (int_col,int),
+    "long": (long_col,int),
+    "float": (float_col,float),
+    "double": (double_col,float)
+}
+
+# Types parsed from their string representation in the engine (constant formula: compiled once per column)
+PARSERS = {
+    "java.time.LocalDate": "parseLocalDate",
+    "java.time.LocalTime": "parseLocalTime",
+    "java.time.Duration": "parseDuration"
+}
+
+DTYPES = {
+    "java.lang.String": dht.string,
+    "java.lang.Boolean": dht.bool_,
+    "byte": dht.byte,
+    "short": dht.short,
+    "int": dht.int32,
+    "long": dht.long,
+    "float": dht.float32,
+    "double": dht.double,
+    "java.time.LocalDate": dht.LocalDate,
+    "java.time.LocalTime": dht.LocalTime,
+    "java.time.Duration": dht.Duration
+}
+
+def supported(typ:str) -> bool:
+    return (typ in COLUMNS) or (typ in PARSERS)
+
+def valuesTable(typ:str,c:str,vs:typing.List) -> Table:
+
+    """
+    One column table holding the values vs of column c
+    """
+
+    if typ in COLUMNS:
+        col,cast = COLUMNS[typ]
+        return new_table([col(c,[cast(v) for v in vs])])
+
+    if typ in PARSERS:
+        return new_table([string_col("__v",[str(v) for v in vs])]).update(f"{c} = {PARSERS[typ]}(__v)").view([c])
+
+    raise ValueError(f"Type: {typ} not supported")
+
+class Selection(object):
+
+    """
+    Keyed input tables holding the current selection of each column. Filters built with where_in against
+    these tables follow selection changes without rebuilding the query
+    """
+
+    def __init__(self,ctypes:typing.Dict[str,str],cols:typing.List[str]) -> None:
+        self._ctypes = ctypes
+
+        # Identity in cache keys (object ids are reused once a session is gone)
+        self.key = uuid.uuid4().hex
+
+        self._tables = {c:input_table(col_defs={c:DTYPES[ctypes[c]]},key_cols=c) for c in cols if ctypes[c] in DTYPES}
+        self._values = {c:[] for c in self._tables}
+
+    def has(self,col:str) -> bool:
+        return col in self._tables
+
+    def table(self,col:str) -> Table:
+        return self._tables[col]
+
+    def set(self,filter_values:typing.Dict[str,typing.List]) -> None:
+
+        for c,vs in filter_values.items():
+
+            if not c in self._tables:
+                continue
+
+            added = [v for v in vs if not v in self._values[c]]
+            removed = [v for v in self._values[c] if not v in vs]
+
+            if len(removed)>0:
+                self._tables[c].delete(valuesTable(self._ctypes[c],c,removed))
+            if len(added)>0:
+                self._tables[c].add(valuesTable(self._ctypes[c],c,added))
+
+            self._values[c] = list(vs)
@@ -0,0 +1,28 @@
+import typing
+
+from deephaven import ui
+
+class Session(object):
+
+    """
+    Dashboard state of one viewer. Must be created while rendering a component: values and setters come from ui.use_state
+    """
+
+    def __init__(self,defaults:typing.Dict) -> None:
+
+        self.chart_type,self.set_chart_type = ui.use_state(defaults["chart_type"])
+        self.filter_values,self.set_filter_values = ui.use_state(defaults["filter_values"])
+        self.by_values,self.set_by_values = ui.use_state(defaults["by_values"])
+        self.metric_values,self.set_metric_values = ui.use_state(defaults["metric_values"])
+        self.modifiers,self.set_modifiers = ui.use_state(defaults["modifiers"])
+        self.preview,self.set_preview = ui.use_state(defaults["preview"])
+
+    def state(self) -> typing.Dict:
+        return {
+            "chart_type": self.chart_type,
+            "filter_values": self.filter_values,
+            "by_values": self.by_values,
+            "metric_values": self.metric_values,
+            "modifiers": self.modifiers,
+            "preview": self.preview
+        }
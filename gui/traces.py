@@ -1,78 +1,168 @@
 import typing
 
 import pandas as pd
+import numpy as np
 
 import deephaven.plot.express as dx
 
+from deephaven import agg
 from deephaven.table import Table
 from deephaven.pandas import to_pandas
+from deephaven.updateby import cum_sum
 
 import plotly.express as px
 import plotly.graph_objects as go
 
+# Hard cap on the rows shipped to plotly
+MAX_ROWS = 100000
+
+def limited(t:Table,max_rows:int=MAX_ROWS) -> pd.DataFrame:
+
+    """
+    The first max_rows rows; the row count before the cut is kept in df.attrs["total_rows"] (see truncated)
+    """
+
+    total = t.size
+    df = to_pandas(t.head(max_rows) if total>max_rows else t)
+    df.attrs["total_rows"] = total
+
+    return df
+
+def truncated(fig:go.Figure,df:pd.DataFrame) -> go.Figure:
+
+    """
+    Tell the viewer in the chart when the frame was cut to MAX_ROWS
+    """
+
+    total = df.attrs.get("total_rows",len(df))
+    if total>len(df):
+        fig.add_annotation(text=f"Showing the first {len(df)} of {total} rows",xref="paper",yref="paper",x=0,y=1.08,showarrow=False,xanchor="left")
+
+    return fig
+
+# Confidence intervals of the aggregated table ({metric}_lo,{metric}_hi, see Manager.bootstrapBlock) as error bars
+def intervals(cols:typing.List[str],metric:str) -> typing.List[str]:
+    return [f"{metric}_lo",f"{metric}_hi"] if all([f"{metric}_{x}" in cols for x in ["lo","hi"]]) else []
+
+def errorY(df:pd.DataFrame,metric:str) -> typing.Dict|None:
+
+    if len(intervals(df.columns,metric))==0:
+        return None
+
+    return dict(type="data",symmetric=False,array=df[f"{metric}_hi"] - df[metric],arrayminus=df[metric] - df[f"{metric}_lo"])
+
+def withErrors(t:Table,metric:str) -> typing.Tuple[Table,typing.Dict]:
+
+    """
+    Error bar columns of dx charts: distances to the interval bounds
+    """
+
+    if len(intervals(t.column_names,metric))==0:
+        return t,{}
+
+    t = t.update_view([f"__{metric}_ep = {metric}_hi - {metric}",f"__{metric}_em = {metric} - {metric}_lo"])
+    return t,{"error_y":f"__{metric}_ep","error_y_minus":f"__{metric}_em"}
+
+# Min/max per bucket of x order, computed in the engine: at most 2 points per bucket and series. Static tables of up
+# to 2*buckets rows are returned as is; on ticking tables the series that small keep a bucket per row, so they pass
+# through unchanged and are downsampled as they grow. Only for series ordered by x (not parametric curves)
+def downsample(t:Table,x:str,y:str,by:str|None,buckets:int|None) -> Table:
+
+    if (buckets is None) or ((not t.is_refreshing) and (t.size<=2*buckets)):
+        return t
+
+    bys = [by] if by is not None else []
+
+    t = t.sort(bys + [x]).update("__one = 1").update_by(cum_sum("__n = __one"),by=bys)
+    t = t.natural_join(t.count_by("__N",by=bys),on=bys,joins="__N")
+    t = t.update(f"__b = __N <= {2*buckets} ? __n : (long)((__n - 1) * {buckets} / __N)")
+
+    ext = t.agg_by([agg.min_(f"__ymin = {y}"),agg.max_(f"__ymax = {y}")],by=bys + ["__b"])
+    t = t.natural_join(ext,on=bys + ["__b"]).where(f"{y} == __ymin || {y} == __ymax")
+
+    return t.first_by(bys + ["__b",y]).drop_columns(["__b","__one","__n","__N","__ymin","__ymax"]).sort(bys + [x])
+
 # Bars has to be implemented through px cause dx does not support nested categories
 def bars(t:Table,bys:typing.List[str],metric:str) -> go.Figure:
+    return barsFrame(limited(t.view(bys + [metric] + intervals(t.column_names,metric))),bys,metric)
 
-    df = to_pandas(t)
+def barsFrame(df:pd.DataFrame,bys:typing.List[str],metric:str) -> go.Figure:
 
     fig = go.Figure()
     N = len(bys)
 
     if N==1:
-        fig.add_trace(go.Bar(x=df[bys[0]],y=df[metric],name=bys[0]))
+        fig.add_trace(go.Bar(x=df[bys[0]],y=df[metric],error_y=errorY(df,metric),name=bys[0]))
         fig.update_layout(xaxis_type="category")
     elif N>1:
-        for n in df[bys[N-1]].unique():
-            fig.add_trace(go.Bar(x=df[df[bys[N-1]]==n][bys].T,y=df[df[bys[N-1]]==n][metric],name=str(n)))
+        # One grouping pass: a trace per legend value, nested categories as the x levels
+        for n,g in df.groupby(bys[N-1],sort=False,dropna=False):
+            fig.add_trace(go.Bar(x=g[bys].to_numpy().T,y=g[metric].to_numpy(),error_y=errorY(g,metric),name=str(n)))
     else:
         raise ValueError("N <= 0")
 
     fig.update_layout(xaxis_title=".".join(bys),yaxis_title=metric)
 
-    return fig
+    return truncated(fig,df)
 
+# Parametric curve of two metrics in row order: not downsampled, re-sorting by mX would reconnect the points
 def lines(t:Table,by:str,mX:str,mY:str) -> dx.DeephavenFigure:
-    return dx.line(t,x=mX,y=mY,by=by,markers=True)
+    t,err = withErrors(t,mY)
+    return dx.line(t,x=mX,y=mY,by=by,markers=True,**err)
 
 # featurelines has to be implemented through px
 # dx does not support the necessary control granularity over traces
 def featurelines(t:Table,bys:typing.List[str],feat:str,metrics:typing.List[str]) -> go.Figure:
+    lncnk,xc = featurelinesTable(t,bys,feat,metrics)
+    return featurelinesFrame(limited(lncnk),xc,feat,metrics)
+
+def featurelinesTable(t:Table,bys:typing.List[str],feat:str,metrics:typing.List[str]) -> typing.Tuple[Table,str]:
 
     # Tag line chunks
     xc = "X".join(bys)
     if len(bys)>1:
         t = t.update(f"{xc} = {bys[0]} + `.` + {bys[1]}")
 
-    lncnk = t.select([xc , f"{feat} = `` + {feat}"] + metrics)
+    return t.select([xc , f"{feat} = `` + {feat}"] + metrics + [c for m in metrics for c in intervals(t.column_names,m)]),xc
 
-    # Insert None between line chunks
+def segments(df:pd.DataFrame,xc:str,cols:typing.List[str]) -> typing.Dict[str,np.ndarray]:
 
-    X = [[],[]]
-    Y = [[] for i in range(len(metrics))]
+    """
+    Rows grouped by line chunk (first appearance order, row order kept within a chunk) with a None after each chunk
+    """
 
-    for tbl in lncnk.partition_by(xc).constituent_tables:
-        df = to_pandas(tbl)
-        for i,row in df.iterrows():
-            X[0].append(row[xc])
-            X[1].append(row[feat])
+    codes,uniq = pd.factorize(df[xc],use_na_sentinel=False)
+    order = np.argsort(codes,kind="stable")
 
-            for j,m in enumerate(metrics):
-                Y[j].append(row[m])
+    # Each row moves right by the number of separators before it
+    pos = np.arange(len(order)) + codes[order]
 
-        X[0].append(None)
-        X[1].append(None)
+    seg = dict()
+    for c in cols:
+        out = np.full(len(order) + len(uniq),None,dtype=object)
+        out[pos] = df[c].to_numpy()[order]
+        seg[c] = out
 
-        for j,m in enumerate(metrics):
-            Y[j].append(None)
+    return seg
+
+def featurelinesFrame(df:pd.DataFrame,xc:str,feat:str,metrics:typing.List[str]) -> go.Figure:
+
+    seg = segments(df,xc,[xc,feat] + metrics + [c for m in metrics for c in intervals(df.columns,m)])
+    X = [seg[xc],seg[feat]]
 
     # Ready to plot now
     fig = go.Figure()
-    for j,m in enumerate(metrics):
-        fig.add_trace(go.Scatter(x=X,y=Y[j],mode="markers+lines",name=m))
+    for m in metrics:
+        err = None
+        if len(intervals(df.columns,m))>0:
+            y,lo,hi = [seg[c].astype(float) for c in [m,f"{m}_lo",f"{m}_hi"]]
+            err = dict(type="data",symmetric=False,array=hi - y,arrayminus=y - lo)
+        fig.add_trace(go.Scatter(x=X,y=seg[m],error_y=err,mode="markers+lines",name=m))
 
     fig.update_layout(xaxis_title=xc,yaxis_title="metrics")
 
-    return fig
+    return truncated(fig,df)
 
-def timeseries(t:Table,tc:str,by:str,metric:str) -> dx.DeephavenFigure:
-    return dx.line(t.update(f"{tc} = {tc}.toString()"),x=tc,y=metric,by=by,markers=True)
\ No newline at end of file
+def timeseries(t:Table,tc:str,by:str,metric:str,buckets:int|None=None) -> dx.DeephavenFigure:
+    t,err = withErrors(downsample(t,tc,metric,by,buckets),metric)
+    return dx.line(t.update(f"{tc} = {tc}.toString()"),x=tc,y=metric,by=by,markers=True,**err)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import typing
+import threading
+import concurrent.futures
+
+from deephaven.execution_context import get_exec_ctx
+
+# One thread pool for all the dashboards of the process (Managers are also created in loops, e.g. by the warm-up)
+_executor = None
+_executor_lock = threading.Lock()
+
+def sharedExecutor(max_workers:int=4) -> concurrent.futures.ThreadPoolExecutor:
+
+    """
+    The process wide pool, sized by its first user
+    """
+
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,thread_name_prefix="dashboard")
+        return _executor
+
+class Worker(object):
+
+    """
+    Background executor for dashboard computations, shared by all sessions
+    """
+
+    def __init__(self,max_workers:int=4,debounce_s:float=0.25) -> None:
+        self._executor = sharedExecutor(max_workers)
+        self._debounce_s = debounce_s
+
+    @property
+    def executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        return self._executor
+
+    @property
+    def debounce_s(self) -> float:
+        return self._debounce_s
+
+class Channel(object):
+
+    """
+    Latest-request-wins queue of one session: a new request supersedes the previous one. Requests are debounced,
+    superseded requests are cancelled if they have not started and their results are dropped if they have
+    """
+
+    def __init__(self,worker:Worker) -> None:
+        self._worker = worker
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._timer = None
+        self._future = None
+
+    def current(self,generation:int) -> bool:
+        return generation==self._generation
+
+    def submit(self,fn:typing.Callable,on_done:typing.Callable[[typing.Any],None],on_error:typing.Callable[[BaseException],None]) -> None:
+
+        # Engine operations need the execution context of the caller
+        ctx = get_exec_ctx()
+
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._stop()
+
+        def run() -> None:
+
+            if not self.current(generation):
+                return
+
+            try:
+                with ctx:
+                    res = fn()
+            except Exception as e:
+                if self.current(generation):
+                    on_error(e)
+                return
+
+            if self.current(generation):
+                on_done(res)
+
+        # Debounce on a timer: no pool thread is held while waiting
+        def start() -> None:
+            with self._lock:
+                if self.current(generation):
+                    self._future = self._worker.executor.submit(run)
+
+        with self._lock:
+            self._timer = threading.Timer(self._worker.debounce_s,start)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._future is not None:
+            self._future.cancel()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._stop()
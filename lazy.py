@@ -0,0 +1,32 @@
+"""
+Lazy imports of heavy dependencies (databento, plotting): the module is only executed on first attribute access
+"""
+
+import sys
+import importlib
+import importlib.util
+
+def module(name:str):
+
+    if name in sys.modules:
+        return sys.modules[name]
+
+    # Parent packages are imported normally
+    parent,_,child = name.rpartition(".")
+    if parent:
+        importlib.import_module(parent)
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}",name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    loader.exec_module(mod)
+
+    if parent:
+        setattr(sys.modules[parent],child,mod)
+
+    return mod
@@ -0,0 +1,153 @@
+"""
+Timing and JVM memory measurements
+"""
+
+import sys
+import time
+import typing
+import threading
+import importlib.abc
+
+def _jtype(name:str):
+    # jpy only works once the JVM is up: imported on first use, so the entry points can time the server start
+    import jpy
+    return jpy.get_type(name)
+
+def heapUsedMB() -> float:
+    rt = _jtype("java.lang.Runtime").getRuntime()
+    return (rt.totalMemory() - rt.freeMemory()) / 1024**2
+
+def currentStep() -> int:
+    """
+    Logical clock step of the update graph (one step per update cycle)
+    """
+    ctx = _jtype("io.deephaven.engine.context.ExecutionContext").getContext()
+    return ctx.getUpdateGraph().clock().currentStep()
+
+def _heapPools() -> typing.List:
+    pools = _jtype("java.lang.management.ManagementFactory").getMemoryPoolMXBeans()
+    return [pools.get(i) for i in range(pools.size()) if pools.get(i).getType().name()=="HEAP"]
+
+def gc() -> None:
+    _jtype("java.lang.System").gc()
+
+def resetPeakHeap() -> None:
+    for p in _heapPools():
+        p.resetPeakUsage()
+
+def peakHeapMB() -> float:
+    return sum([p.getPeakUsage().getUsed() for p in _heapPools()]) / 1024**2
+
+class Timer(object):
+
+    """
+    Context manager recording wall time and peak heap of the enclosed block (heap=False: wall time only,
+    usable before the JVM is started)
+    """
+
+    def __init__(self,reset:bool=True,heap:bool=True) -> None:
+        self._reset = reset and heap
+        self._heap = heap
+        self.wall_s = float("nan")
+        self.peak_heap_mb = float("nan")
+
+    def __enter__(self):
+        if self._reset:
+            gc()
+            resetPeakHeap()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self,*exc) -> None:
+        self.wall_s = time.perf_counter() - self._t0
+        if self._heap:
+            self.peak_heap_mb = peakHeapMB()
+
+#########################################
+#########################################
+
+class _TimedLoader(object):
+
+    def __init__(self,loader,timer:"ImportTimer") -> None:
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self,name:str):
+        return getattr(self._loader,name)
+
+    def create_module(self,spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self,module) -> None:
+        self._timer.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit(module.__name__)
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+
+    """
+    Times the execution of the modules imported while installed: inclusive time and self time
+    (excluding the modules it imported). Lazy modules are timed when they are actually loaded
+    """
+
+    def __init__(self) -> None:
+        self.inclusive = dict()
+        self.self_time = dict()
+        self._local = threading.local()
+
+    def install(self) -> "ImportTimer":
+        sys.meta_path.insert(0,self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self,name:str,path=None,target=None):
+
+        for finder in sys.meta_path:
+            if (finder is self) or (not hasattr(finder,"find_spec")):
+                continue
+            spec = finder.find_spec(name,path,target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if (spec.loader is not None) and hasattr(spec.loader,"exec_module"):
+            spec.loader = _TimedLoader(spec.loader,self)
+
+        return spec
+
+    def _stack(self) -> typing.List:
+        if not hasattr(self._local,"stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def enter(self) -> None:
+        self._stack().append([time.perf_counter(),0.0])
+
+    def exit(self,name:str) -> None:
+        stack = self._stack()
+        t0,children = stack.pop()
+        dt = time.perf_counter() - t0
+        self.inclusive[name] = dt
+        self.self_time[name] = dt - children
+        if len(stack)>0:
+            stack[-1][1] += dt
+
+def startupReport(imports:ImportTimer,sections:typing.Dict[str,float],top:int=25) -> None:
+
+    """
+    Print the timed startup sections (e.g. JVM start) and the slowest imports
+    """
+
+    print(f"[+] Startup profile")
+    for name,dt in sections.items():
+        print(f"    {name:40s} {dt:8.3f}s")
+
+    print(f"    {'module':40s} {'self':>8s} {'incl':>9s}")
+    for name in sorted(imports.self_time,key=lambda n:-imports.self_time[n])[:top]:
+        print(f"    {name:40s} {imports.self_time[name]:8.3f}s {imports.inclusive[name]:8.3f}s")
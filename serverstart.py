@@ -1,25 +1,46 @@
 #!/usr/bin/env ipython -i
 
+import sys,argparse
 import importlib
-import pandas as pd
-import numpy as np
 
-from deephaven_server.server import Server
+import lazy
+import profiling
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--profile-startup",dest="profile",action="store_true",default=False,help="report import and server start times")
+cmd_args,_ = parser.parse_known_args(sys.argv[1:])
+
+imports = profiling.ImportTimer().install() if cmd_args.profile else None
+sections = dict()
+
+with profiling.Timer(heap=False) as tm:
+    from deephaven_server.server import Server
+sections["import deephaven_server"] = tm.wall_s
 
 # Start a server with 8GB RAM on port 10000 and the default PSK authentication
-s = Server(port=10000, jvm_args=["-Xmx8g","-DAuthHandlers=io.deephaven.auth.AnonymousAuthenticationHandler","-Dprocess.info.system-info.enabled=false"])
-s.start()
+with profiling.Timer(heap=False) as tm:
+    s = Server(port=10000, jvm_args=["-Xmx8g","-DAuthHandlers=io.deephaven.auth.AnonymousAuthenticationHandler","-Dprocess.info.system-info.enabled=false"])
+    s.start()
+sections["server start (JVM)"] = tm.wall_s
 
 from deephaven import new_table,empty_table,agg,ui
 from deephaven.table import Table
 from deephaven.column import int_col,float_col,string_col
 
 import deephaven.numpy as dhnp
-import deephaven.pandas as dhpd
 import deephaven.updateby as dhuby
 
-import deephaven.plot.express as dx
+# numpy is a dependency of deephaven itself. pandas and plotting are loaded on first use
+import numpy as np
+pd = lazy.module("pandas")
+dhpd = lazy.module("deephaven.pandas")
+dx = lazy.module("deephaven.plot.express")
+
+import data
+dbclient = lazy.module("data.dbclient")
 
-import data.dbclient
+from globalscope import *
 
-from globalscope import *
\ No newline at end of file
+if imports is not None:
+    imports.uninstall()
+    profiling.startupReport(imports,sections)
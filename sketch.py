@@ -0,0 +1,129 @@
+"""
+Mergeable approximate distributions (log-bucketed histograms, DDSketch style). Values are mapped to buckets of
+relative width ALPHA by an engine formula; the sketch of a group is the array of its non-empty buckets and their
+counts ({name}_bkt,{name}_cnt). Sketches of different groups or partitions merge by summing counts per bucket,
+quantiles are within ALPHA relative error and memory per group is bounded by the number of buckets
+"""
+
+import math
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+from deephaven import agg
+from deephaven.table import Table
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA = math.log(GAMMA)
+
+# Absolute values below MIN_ABS go to bucket 0, buckets are signed and offset so that codes of positive values are >0
+MIN_ABS = 1e-9
+OFFSET = 1100
+
+def columns(name:str) -> typing.List[str]:
+    return [f"{name}_bkt",f"{name}_cnt"]
+
+def bucketFormula(col:str) -> str:
+
+    """
+    Engine formula of the bucket code of col (NULL_INT for null and NaN values)
+    """
+
+    code = f"(int)min({2*OFFSET},max(1,(int)ceil(log(abs({col})) / {LOG_GAMMA}) + {OFFSET}))"
+    return f"(isNull({col}) || isNaN({col})) ? NULL_INT : (abs({col}) < {MIN_ABS} ? 0 : (int)signum({col}) * {code})"
+
+#########################################
+#########################################
+
+# Engine side: build and merge sketches per group
+
+def sketchOf(t:Table,col:str,by:typing.List[str],name:str|None=None) -> Table:
+
+    """
+    Sketch of col per group of by
+    """
+
+    bkt,cnt = columns(name or col)
+
+    t = t.update_view(f"__bkt = {bucketFormula(col)}").where("!isNull(__bkt)")
+    t = t.count_by(cnt,by=by + ["__bkt"]).rename_columns([f"{bkt} = __bkt"])
+
+    return t.group_by(by)
+
+def mergeSketches(t:Table,name:str,by:typing.List[str]) -> Table:
+
+    """
+    Merge the sketches stored in the rows of t per group of by
+    """
+
+    bkt,cnt = columns(name)
+
+    t = t.view(by + [bkt,cnt]).ungroup([bkt,cnt])
+    t = t.agg_by([agg.sum_(cnt)],by=by + [bkt])
+
+    return t.group_by(by)
+
+#########################################
+#########################################
+
+# numpy side: usable as query functions on the sketch columns, e.g. sketchQuantile(move_bkt,move_cnt,0.5)
+
+def bucketValues(bkt:np.ndarray) -> np.ndarray:
+
+    """
+    Representative value of the buckets (relative error ALPHA)
+    """
+
+    bkt = np.asarray(bkt,dtype=np.int64)
+    k = np.abs(bkt) - OFFSET
+    vals = np.sign(bkt) * 2 * np.power(GAMMA,k) / (GAMMA + 1)
+
+    return np.where(bkt==0,0.0,vals)
+
+def merge(bkts:typing.List[np.ndarray],cnts:typing.List[np.ndarray]) -> typing.Tuple[np.ndarray,np.ndarray]:
+
+    bkt = np.concatenate([np.asarray(b,dtype=np.int64) for b in bkts])
+    cnt = np.concatenate([np.asarray(c,dtype=np.int64) for c in cnts])
+
+    keys,inv = np.unique(bkt,return_inverse=True)
+    return keys,np.bincount(inv,weights=cnt,minlength=len(keys)).astype(np.int64)
+
+def sketchQuantile(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64],q:float) -> float:
+
+    if (bkt is None) or (len(bkt)==0):
+        return np.nan
+
+    vals = bucketValues(bkt)
+    order = np.argsort(vals)
+    cum = np.cumsum(np.asarray(cnt,dtype=np.float64)[order])
+
+    return float(vals[order][np.searchsorted(cum,q*cum[-1])])
+
+def sketchCdf(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64],x:float) -> float:
+
+    """
+    Fraction of the values <= x
+    """
+
+    if (bkt is None) or (len(bkt)==0):
+        return np.nan
+
+    cnt = np.asarray(cnt,dtype=np.float64)
+    return float(cnt[bucketValues(bkt)<=x].sum() / cnt.sum())
+
+def sketchCount(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64]) -> int:
+    return int(np.sum(cnt)) if cnt is not None else 0
+
+def sketchHistogram(bkt:npt.NDArray[np.int32],cnt:npt.NDArray[np.int64],edges:typing.Sequence[float]) -> npt.NDArray[np.int64]:
+
+    """
+    Counts between consecutive edges
+    """
+
+    if (bkt is None) or (len(bkt)==0):
+        return np.zeros(len(edges)-1,dtype=np.int64)
+
+    hist,_ = np.histogram(bucketValues(bkt),bins=np.asarray(edges,dtype=np.float64),weights=np.asarray(cnt,dtype=np.float64))
+    return hist.astype(np.int64)
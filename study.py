@@ -0,0 +1,209 @@
+"""
+Headless runs of the data.analysis studies from a declarative config. The study is run one date at a time and each
+date is written as a parquet partition (output/date=YYYY-MM-DD/). Needs a running server: use studystart.py
+
+Config (json):
+
+    {
+        "study": "analyzeEvents" | "analyzeTag" | "analyzeMove",
+        "root": "data/",
+        "universe": {"mbp1": ["symbol = `SPY`"], "tcbbo": []},
+        "dates": {"start": "2025-01-02", "end": "2025-03-31"},
+        "hook": "module:function",
+        "features": ["imb"],
+        "lags": ["0.1s","1s","10s"],
+        "ticklags": [1,10],
+        "bys": ["venue","expiry_type"],
+        "output": "results/spy_imb"
+    }
+
+hook is called with the MBP1 object of the date: for analyzeEvents it returns the events (with the feature and
+forecast_<feature> columns), for analyzeTag/analyzeMove the table joined to the option trades
+"""
+
+import os
+import csv
+import json
+import typing
+import datetime
+import importlib
+
+import deephaven.parquet as dhpq
+from deephaven.table import Table
+
+import profiling
+
+from data.store import ResultStore
+from data.dbclient import DBHClient
+from data.analysis import MBP1,TCBBO,makeLagTable
+
+#########################################
+#########################################
+
+STUDIES = ["analyzeEvents","analyzeTag","analyzeMove"]
+
+REPORT = ["date","status","rows","wall_s","peak_heap_mb","message"]
+
+def load(path:str) -> typing.Dict:
+
+    with open(path) as f:
+        cfg = json.load(f)
+
+    if not cfg.get("study") in STUDIES:
+        raise ValueError(f"Study must be one of {STUDIES}")
+
+    for k in ["dates","hook","output"]:
+        if not k in cfg:
+            raise ValueError(f"Missing {k} in study config")
+
+    return cfg
+
+def resolve(spec:str) -> typing.Callable:
+
+    """
+    module:function -> function
+    """
+
+    mod,fn = spec.split(":")
+    return getattr(importlib.import_module(mod),fn)
+
+def dates(cfg:typing.Dict,dbc:DBHClient) -> typing.List[str]:
+
+    """
+    Trading dates of the config range from the business calendar (no runs on exchange holidays)
+    """
+
+    rng = cfg["dates"]
+
+    cal = dbc.calendar(rng["start"],rng["end"]).where(["business",f"date >= parseLocalDate(`{rng['start']}`)",f"date <= parseLocalDate(`{rng['end']}`)"])
+    return [x["date"] for x in cal.view("date = String.valueOf(date)").iter_dict()]
+
+def dayFilter(date:str,col:str="ts_event") -> typing.List[str]:
+    nxt = (datetime.date.fromisoformat(date) + datetime.timedelta(days=1)).isoformat()
+    return [f"{col} >= '{date}T00:00:00 ET'",f"{col} < '{nxt}T00:00:00 ET'"]
+
+def partition(output:str,date:str) -> str:
+    return os.path.join(output,f"date={date}","part.parquet")
+
+#########################################
+#########################################
+
+def runDate(cfg:typing.Dict,dbc:DBHClient,date:str) -> Table:
+
+    universe = cfg.get("universe",{})
+    day = dayFilter(date)
+    hook = resolve(cfg["hook"])
+
+    mbp1 = MBP1.fromDB(dbc,filters=universe.get("mbp1",[]) + day)
+
+    match cfg["study"]:
+
+        case "analyzeEvents":
+            lags = makeLagTable(cfg["lags"]) if "lags" in cfg else MBP1.TIMELAGS
+            return mbp1.analyzeEvents(hook(mbp1),feature_names=cfg.get("features",[]),timelags=lags,ticklags=cfg.get("ticklags",[1,5,10,50,100]))
+
+        case "analyzeTag":
+            tcbbo = TCBBO.fromDB(dbc,filters=universe.get("tcbbo",[]) + day)
+            return tcbbo.analyzeTag(mbp1,hook,features=cfg.get("features",[]),bys=cfg.get("bys",[]))
+
+        case "analyzeMove":
+            tcbbo = TCBBO.fromDB(dbc,filters=universe.get("tcbbo",[]) + day)
+            lags = makeLagTable(cfg["lags"],symmetric=True) if "lags" in cfg else TCBBO.TIMELAGS
+            return tcbbo.analyzeMove(mbp1,hook,bys=cfg.get("bys",[]),lags=lags)
+
+        case _:
+            raise ValueError(f"Study {cfg['study']} not implemented")
+
+def run(cfg:typing.Dict,overwrite:bool=False) -> typing.List[typing.Dict]:
+
+    """
+    Run every date of the config, dates already written are skipped unless overwrite. A failed date is
+    reported and the run moves on to the next one
+    """
+
+    dbc = DBHClient(cfg.get("root","data/"))
+    output = cfg["output"]
+
+    report = []
+    for date in dates(cfg,dbc):
+
+        pth = partition(output,date)
+        if os.path.exists(pth) and not overwrite:
+            report.append({"date":date,"status":"skipped","rows":0,"wall_s":0.0,"peak_heap_mb":0.0,"message":pth})
+            continue
+
+        try:
+            with profiling.Timer() as tm:
+                res = runDate(cfg,dbc,date)
+                rows = res.size
+                if rows>0:
+                    os.makedirs(os.path.dirname(pth),exist_ok=True)
+                    dhpq.write(res,pth)
+
+            rec = {"date":date,"status":"done" if rows>0 else "empty","rows":rows,"wall_s":round(tm.wall_s,3),"peak_heap_mb":round(tm.peak_heap_mb,1),"message":""}
+
+        except Exception as e:
+            rec = {"date":date,"status":"failed","rows":0,"wall_s":round(tm.wall_s,3),"peak_heap_mb":round(tm.peak_heap_mb,1),"message":repr(e)}
+
+        print(f"[{'+' if rec['status']!='failed' else '-'}] {date} {rec['status']:7s} rows={rec['rows']:<10d} wall={rec['wall_s']:.3f}s heap={rec['peak_heap_mb']:.0f}MB {rec['message']}")
+        report.append(rec)
+
+    # Keep the report next to the results
+    os.makedirs(output,exist_ok=True)
+    with open(os.path.join(output,"report.csv"),"w",newline="") as f:
+        w = csv.DictWriter(f,fieldnames=REPORT)
+        w.writeheader()
+        w.writerows(report)
+
+    return report
+
+#########################################
+#########################################
+
+def params(cfg:typing.Dict) -> typing.Dict:
+    """
+    What the result depends on, besides the dates and the input data
+    """
+    return {k:v for k,v in cfg.items() if not k in ["dates","output"]}
+
+def inputVersion(cfg:typing.Dict,dbc:DBHClient,date:str) -> str:
+
+    """
+    Version of the inputs of date (DBHClient.tableVersion): changes when data for the date is added or replaced,
+    and not when other dates are appended
+    """
+
+    tables = ["databento_nbbo"] + (["opra_trades"] if cfg["study"]!="analyzeEvents" else [])
+    return ",".join([dbc.tableVersion(t,date) for t in tables])
+
+def stored(cfg:typing.Dict,store:ResultStore) -> str:
+
+    """
+    Run the study into a result store: only dates that are missing or whose inputs changed are computed.
+    Returns the key of the result (store.load(key))
+    """
+
+    dbc = DBHClient(cfg.get("root","data/"))
+    prms = params(cfg)
+    key = store.key(prms)
+
+    with profiling.Timer() as tm:
+        t = store.compute(key,dates(cfg,dbc),lambda d:runDate(cfg,dbc,d),version=lambda d:inputVersion(cfg,dbc,d),params=prms)
+
+    print(f"[+] {key} rows={t.size} wall={tm.wall_s:.3f}s heap={tm.peak_heap_mb:.0f}MB")
+    return key
+
+def summary(report:typing.List[typing.Dict]) -> str:
+
+    done = [r for r in report if r["status"] in ["done","empty"]]
+    failed = [r for r in report if r["status"]=="failed"]
+
+    return " ".join([
+        f"dates={len(report)}",
+        f"done={len(done)}",
+        f"skipped={len([r for r in report if r['status']=='skipped'])}",
+        f"failed={len(failed)}",
+        f"rows={sum([r['rows'] for r in done])}",
+        f"wall={sum([r['wall_s'] for r in report]):.1f}s",
+        f"peak_heap={max([r['peak_heap_mb'] for r in report] + [0.0]):.0f}MB"
+    ])
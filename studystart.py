@@ -0,0 +1,36 @@
+import sys,argparse
+from deephaven_server.server import Server
+
+JVM_ARGS = [
+    "-DAuthHandlers=io.deephaven.auth.AnonymousAuthenticationHandler",
+    "-Dprocess.info.system-info.enabled=false"
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("config",action="store",type=str,help="study config (json)")
+parser.add_argument("-s","--store",dest="store",action="store",type=str,default=None,help="write to the result store at this root instead of the config output")
+parser.add_argument("-o","--overwrite",dest="overwrite",action="store_true",default=False,help="recompute dates already written")
+parser.add_argument("-p","--port",dest="port",action="store",type=int,default=10000,help="server port")
+parser.add_argument("-M","--memory",dest="memgb",action="store",type=int,default=8,help="cap memory in GB")
+
+def main():
+
+    cmd_args = parser.parse_args(sys.argv[1:])
+
+    s = Server(port=cmd_args.port, jvm_args=JVM_ARGS + [f"-Xmx{cmd_args.memgb}g"])
+    s.start()
+
+    import study
+
+    if cmd_args.store is not None:
+        from data.store import ResultStore
+        study.stored(study.load(cmd_args.config),ResultStore(cmd_args.store))
+        sys.exit(0)
+
+    report = study.run(study.load(cmd_args.config),overwrite=cmd_args.overwrite)
+    print(f"[+] {study.summary(report)}")
+
+    sys.exit(1 if any([r["status"]=="failed" for r in report]) else 0)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Bulk synthetic data: whole columns are drawn as numpy arrays (seeded) instead of
+calling the query scope utils in globalscope once per cell
+"""
+
+import time
+import typing
+import collections
+
+import numpy as np
+
+from deephaven import agg,merge,new_table,time_table
+from deephaven.table import Table
+from deephaven.column import string_col,int_col,long_col,double_col
+from deephaven.constants import NULL_DOUBLE
+from deephaven.stream import blink_to_append_only
+from deephaven.stream.table_publisher import table_publisher
+from deephaven.table_listener import listen
+import deephaven.dtypes as dht
+
+import utils
+import profiling
+
+#########################################
+#########################################
+
+# Column specifications: name -> (kind,params)
+def choice(*values) -> typing.Tuple:
+    return ("choice",values)
+
+def uniform(lo:float,hi:float) -> typing.Tuple:
+    return ("uniform",(lo,hi))
+
+def keys(prefix:str,n:int) -> typing.Tuple:
+    return choice(*[f"{prefix}{i}" for i in range(n)])
+
+def toTable(arrs:typing.Dict[str,np.ndarray],strings:typing.Dict[str,typing.Sequence[str]]={}) -> Table:
+
+    """
+    Table from numpy arrays. Columns in strings hold integer codes into the given values
+    """
+
+    cols = []
+    for name,arr in arrs.items():
+        if name in strings:
+            cols.append(int_col(f"__{name}",arr.astype(np.int32)))
+        elif arr.dtype==np.int32:
+            cols.append(int_col(name,arr))
+        elif arr.dtype==np.int64:
+            cols.append(long_col(name,arr))
+        else:
+            cols.append(double_col(name,arr.astype(np.float64)))
+
+    t = new_table(cols)
+
+    # Strings never cross into java one by one: join the codes on a small lookup table
+    for name,vals in strings.items():
+        lkp = new_table([int_col(f"__{name}",np.arange(len(vals),dtype=np.int32)),string_col(name,list(vals))])
+        t = t.natural_join(lkp,on=f"__{name}",joins=name)
+
+    return t.view(list(arrs.keys()))
+
+class Generator(object):
+
+    def __init__(self,seed:int=0) -> None:
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rng(self) -> np.random.Generator:
+        return self._rng
+
+    @staticmethod
+    def dtype(spec:typing.Tuple) -> dht.DType:
+
+        kind,params = spec
+
+        match kind:
+            case "choice":
+                if all([isinstance(v,str) for v in params]):
+                    return dht.string
+                if all([isinstance(v,(int,np.integer)) for v in params]):
+                    return dht.int32
+                return dht.double
+            case "uniform":
+                return dht.double
+            case _:
+                raise ValueError(f"Column kind: {kind} not implemented")
+
+    def arrays(self,n:int,columns:typing.Dict[str,typing.Tuple]) -> typing.Dict[str,np.ndarray]:
+
+        """
+        Draw n values for each column. String choices are returned as integer codes into the choices
+        """
+
+        arrs = dict()
+        for name,(kind,params) in columns.items():
+            match kind:
+                case "choice":
+                    codes = self._rng.integers(0,len(params),size=n,dtype=np.int32)
+                    typ = self.dtype((kind,params))
+                    if typ==dht.string:
+                        arrs[name] = codes
+                    elif typ==dht.int32:
+                        arrs[name] = np.asarray(params,dtype=np.int32)[codes]
+                    else:
+                        arrs[name] = np.asarray(params,dtype=np.float64)[codes]
+                case "uniform":
+                    arrs[name] = self._rng.uniform(params[0],params[1],size=n)
+                case _:
+                    raise ValueError(f"Column kind: {kind} not implemented")
+
+        return arrs
+
+    def table(self,n:int,columns:typing.Dict[str,typing.Tuple]) -> Table:
+        strings = {c:spec[1] for c,spec in columns.items() if self.dtype(spec)==dht.string}
+        return toTable(self.arrays(n,columns),strings)
+
+    def attach(self,t:Table,columns:typing.Dict[str,typing.Tuple]) -> Table:
+
+        """
+        Attach generated columns to an existing (static) table
+        """
+
+        return utils.hmerge(t,self.table(t.size,columns))
+
+#########################################
+#########################################
+
+# Market data shaped tables (databento schemas), generated in chunks to bound python memory
+
+SESSION_START = np.datetime64("2025-01-02T14:30:00","ns").astype(np.int64)
+
+def nbbo(n:int,seed:int=0,symbol:str="SPY",mid0:float=500.0,chunk:int=10_000_000) -> Table:
+
+    """
+    Single symbol MBP-1 (top of book) events
+    """
+
+    rng = np.random.default_rng(seed)
+    ts0,mid = SESSION_START,mid0
+
+    chnks = []
+    for k in range(0,n,chunk):
+
+        m = min(chunk,n-k)
+
+        ts = ts0 + np.cumsum(rng.exponential(1e5,size=m)).astype(np.int64)
+        mids = mid + 0.005*np.cumsum(rng.integers(-1,2,size=m))
+        spread = 0.01*rng.integers(1,4,size=m)
+        action = rng.choice(4,size=m,p=[0.45,0.35,0.1,0.1]).astype(np.int32)
+        side = rng.integers(0,2,size=m)
+
+        bid = mids - 0.5*spread
+        ask = mids + 0.5*spread
+
+        arrs = {
+            "__ts": ts,
+            "symbol": np.zeros(m,dtype=np.int32),
+            "publisher_id": np.full(m,2,dtype=np.int32),
+            "action": action,
+            "price": np.where(side==1,ask,bid),
+            "size": rng.integers(1,500,size=m,dtype=np.int32),
+            "bid_px_00": bid,
+            "ask_px_00": ask,
+            "bid_sz_00": rng.integers(1,1000,size=m,dtype=np.int32),
+            "ask_sz_00": rng.integers(1,1000,size=m,dtype=np.int32)
+        }
+
+        chnks.append(toTable(arrs,{"symbol":[symbol],"action":["A","C","M","T"]}))
+        ts0,mid = ts[-1],mids[-1]
+
+    t = merge(chnks) if len(chnks)>1 else chnks[0]
+    return t.update("ts_event = epochNanosToInstant(__ts)").drop_columns(["__ts"]).move_columns_up(["ts_event"])
+
+def opraTrades(n:int,seed:int=0,ninstruments:int=1000,mid0:float=500.0,chunk:int=10_000_000) -> typing.Dict[str,Table]:
+
+    """
+    OPRA trades with matching option definitions and publishers: the inputs of analysis.TCBBO.fromTables
+    """
+
+    rng = np.random.default_rng(seed)
+
+    # Definitions
+    instr = np.arange(ninstruments,dtype=np.int32)
+    opts = toTable({
+        "instrument_id": instr,
+        "instrument_class": (instr % 2).astype(np.int32),
+        "strike_price": mid0 + 1.0*(instr // 2 % 100 - 50),
+        "days2expiry": rng.choice([0,1,2,5,10,30,60,120],size=ninstruments).astype(np.int32)
+    },{"instrument_class":["C","P"]})
+
+    venues = ["AMXO","BOXO","CBOE","ISXO","MIAX","XPHL"]
+    feeds = toTable({"publisher_id":np.arange(len(venues),dtype=np.int32),"venue":np.arange(len(venues),dtype=np.int32)},{"venue":venues})
+
+    # Trades
+    ts0 = SESSION_START
+    chnks = []
+    for k in range(0,n,chunk):
+
+        m = min(chunk,n-k)
+
+        ts = ts0 + np.cumsum(rng.exponential(1e6,size=m)).astype(np.int64)
+        px = rng.uniform(0.05,20.0,size=m)
+        spread = px*rng.uniform(0.01,0.1,size=m)
+        loc = rng.choice(3,size=m,p=[0.4,0.2,0.4])
+
+        arrs = {
+            "__ts": ts,
+            "instrument_id": rng.integers(0,ninstruments,size=m,dtype=np.int32),
+            "publisher_id": rng.integers(0,len(venues),size=m,dtype=np.int32),
+            "price": px + spread*(loc - 1)/2,
+            "size": rng.integers(1,50,size=m,dtype=np.int32),
+            "bid_px_00": px - 0.5*spread,
+            "ask_px_00": px + 0.5*spread
+        }
+
+        chnks.append(toTable(arrs))
+        ts0 = ts[-1]
+
+    t = merge(chnks) if len(chnks)>1 else chnks[0]
+    t = t.update("ts_event = epochNanosToInstant(__ts)").drop_columns(["__ts"]).move_columns_up(["ts_event"])
+
+    return {"data":t,"opts":opts,"feeds":feeds}
+
+#########################################
+#########################################
+
+class Ticker(object):
+
+    """
+    Append-only table that receives a freshly generated block of rows on every tick of a time table
+    """
+
+    def __init__(self,columns:typing.Dict[str,typing.Tuple],period:str="PT1s",rows:int=1,seed:int=0) -> None:
+
+        self._generator = Generator(seed)
+        self._columns = columns
+        self._rows = rows
+
+        col_defs = {"Timestamp":dht.Instant}
+        col_defs.update({c:Generator.dtype(s) for c,s in columns.items()})
+
+        blink,self._publisher = table_publisher(name="synthetic",col_defs=col_defs)
+        self._table = blink_to_append_only(blink)
+
+        # Keep references: the clock drives the publisher for as long as the ticker lives
+        self._clock = time_table(period)
+        self._handle = listen(self._clock,self._onTick)
+
+    @property
+    def table(self) -> Table:
+        return self._table
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def block(self,rows:int|None=None) -> Table:
+        blk = self._generator.table(rows if rows is not None else self._rows,self._columns).update("Timestamp = now()")
+        return blk.move_columns_up(["Timestamp"])
+
+    def _onTick(self,update,is_replay:bool) -> None:
+        self._publisher.add(self.block())
+
+    def stop(self) -> None:
+        self._handle.stop()
+
+#########################################
+#########################################
+
+class LoadGenerator(Ticker):
+
+    """
+    Ticker that publishes at a target rate (rows/second) in batches of a given size, and measures
+    how far behind the tables fed by it are (lag from publication to update notification) and heap growth
+    """
+
+    STATS = {
+        "Timestamp": dht.Instant,
+        "label": dht.string,
+        "cycle": dht.int64,
+        "rows": dht.int64,
+        "gen_ms": dht.double,
+        "lag_ms": dht.double,
+        "heap_mb": dht.double
+    }
+
+    def __init__(self,columns:typing.Dict[str,typing.Tuple],rate:int=10000,batch:int=1000,seed:int=0) -> None:
+
+        self._rate = rate
+        self._batch = batch
+
+        # Published batches: (cycle,update graph step,wall time,rows)
+        self._cycle = 0
+        self._published = collections.deque(maxlen=100000)
+        self._seen = dict()
+        self._watched = []
+
+        stats,self._stats_publisher = table_publisher(name="loadgen",col_defs=self.STATS)
+        self._stats = blink_to_append_only(stats)
+
+        super().__init__(columns,period=f"PT{batch/rate:.6f}S",rows=batch,seed=seed)
+
+    @property
+    def rate(self) -> int:
+        return self._rate
+
+    @property
+    def batch(self) -> int:
+        return self._batch
+
+    @property
+    def stats(self) -> Table:
+        return self._stats
+
+    def summary(self) -> Table:
+
+        """
+        Per label: lag statistics, achieved rate and heap growth
+        """
+
+        calcs = [
+            agg.count_("samples"),
+            agg.sum_("rows"),
+            agg.avg("avg_lag_ms = lag_ms"),
+            agg.max_("max_lag_ms = lag_ms"),
+            agg.avg("avg_gen_ms = gen_ms"),
+            agg.first("heap_mb_start = heap_mb"),
+            agg.last("heap_mb"),
+            agg.first("t_start = Timestamp"),
+            agg.last("t_end = Timestamp")
+        ]
+
+        return self._stats.agg_by(calcs,by="label").update([
+            "heap_growth_mb = heap_mb - heap_mb_start",
+            "rows_per_second = rows / (1e-9 * (epochNanos(t_end) - epochNanos(t_start)))"
+        ])
+
+    def _record(self,label:str,cycle:int,rows:int,gen_ms:float,lag_ms:float) -> None:
+
+        row = new_table([
+            string_col("label",[label]),
+            long_col("cycle",[cycle]),
+            long_col("rows",[rows]),
+            double_col("gen_ms",[gen_ms]),
+            double_col("lag_ms",[lag_ms]),
+            double_col("heap_mb",[profiling.heapUsedMB()])
+        ])
+
+        self._stats_publisher.add(row.update("Timestamp = now()").view(list(self.STATS.keys())))
+
+    def _onTick(self,update,is_replay:bool) -> None:
+
+        # Clock ticks coalesce when the cycle takes longer than the period: keep the target rate anyway
+        ticks = max(1,len(update.added(cols=["Timestamp"])["Timestamp"]))
+
+        t0 = time.perf_counter_ns()
+        self._publisher.add(self.block(self._batch * ticks))
+        t1 = time.perf_counter_ns()
+
+        self._cycle += 1
+        self._published.append((self._cycle,profiling.currentStep(),t1,self._batch * ticks))
+        self._record("generator",self._cycle,self._batch * ticks,(t1 - t0) / 1e6,NULL_DOUBLE)
+
+    def watch(self,t:Table,label:str) -> None:
+
+        """
+        Measure the lag with which t reflects published batches
+        """
+
+        self._seen[label] = 0
+
+        def onUpdate(update,is_replay:bool,label=label) -> None:
+
+            now = time.perf_counter_ns()
+            step = profiling.currentStep()
+
+            # Batches published in an earlier cycle are visible now
+            delivered = [p for p in list(self._published) if (p[0] > self._seen[label]) and (p[1] < step)]
+            if len(delivered)==0:
+                return
+
+            self._seen[label] = delivered[-1][0]
+            self._record(label,delivered[-1][0],sum([p[3] for p in delivered]),NULL_DOUBLE,(now - delivered[0][2]) / 1e6)
+
+        self._watched.append((t,listen(t,onUpdate)))
+
+    def stop(self) -> None:
+        super().stop()
+        for t,h in self._watched:
+            h.stop()
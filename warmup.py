@@ -0,0 +1,269 @@
+"""
+Startup warm-up: preload the universes and compile the query formulas of the analyses and dashboards before the
+first user opens a dashboard. Steps run in a background thread once the server is up, their status is published
+to a ticking table. Apps declare their own steps (declare) while they are initialized, appstart.py runs them
+together with the plans given by --warmup
+"""
+
+import os
+import time
+import typing
+import threading
+
+from deephaven import new_table
+from deephaven.table import Table
+from deephaven.column import string_col,long_col,double_col
+from deephaven.constants import NULL_LONG
+from deephaven.execution_context import get_exec_ctx
+from deephaven.stream import blink_to_append_only
+from deephaven.stream.table_publisher import table_publisher
+import deephaven.dtypes as dht
+
+import profiling
+
+class Warmup(object):
+
+    """
+    Ordered steps name -> fn(warmup). A step can use the results of the previous ones through get()
+    """
+
+    STATUS = {
+        "Timestamp": dht.Instant,
+        "step": dht.string,
+        "status": dht.string,
+        "wall_s": dht.double,
+        "peak_heap_mb": dht.double,
+        "rows": dht.int64,
+        "message": dht.string
+    }
+
+    def __init__(self,steps:typing.Dict[str,typing.Callable[["Warmup"],typing.Any]]) -> None:
+        self._steps = steps
+        self._results = dict()
+        self._done = {name:threading.Event() for name in steps}
+        self._thread = None
+
+        status,self._publisher = table_publisher(name="warmup",col_defs=self.STATUS)
+        self._status = blink_to_append_only(status)
+
+    @property
+    def status(self) -> Table:
+        return self._status
+
+    @property
+    def ready(self) -> bool:
+        return all([e.is_set() for e in self._done.values()])
+
+    def get(self,name:str,timeout:float|None=None):
+
+        """
+        Result of a step, waits for it to finish. Raises the step exception if it failed
+        """
+
+        if not self._done[name].wait(timeout):
+            raise TimeoutError(f"Warm-up step {name} not finished")
+
+        res = self._results[name]
+        if isinstance(res,BaseException):
+            raise RuntimeError(f"Warm-up step {name} failed") from res
+
+        return res
+
+    def start(self) -> "Warmup":
+
+        # Engine operations need the execution context of the caller
+        ctx = get_exec_ctx()
+
+        def run() -> None:
+            with ctx:
+                self.run()
+
+        self._thread = threading.Thread(target=run,name="warmup",daemon=True)
+        self._thread.start()
+
+        return self
+
+    def run(self) -> None:
+
+        with profiling.Timer(reset=False) as total:
+            for name,fn in self._steps.items():
+                self._step(name,fn)
+
+        print(f"[+] Warm-up done in {total.wall_s:.1f}s")
+
+    def _step(self,name:str,fn:typing.Callable[["Warmup"],typing.Any]) -> None:
+
+        self._publish(name,"running",float("nan"),float("nan"),NULL_LONG,"")
+
+        try:
+            with profiling.Timer() as tm:
+                res = fn(self)
+        except Exception as e:
+            self._results[name] = e
+            self._done[name].set()
+            self._publish(name,"failed",tm.wall_s,tm.peak_heap_mb,NULL_LONG,repr(e))
+            print(f"[-] Warm-up {name:24s} failed: {e!r}")
+            return
+
+        self._results[name] = res
+        self._done[name].set()
+
+        # Tables, or analysis objects holding one
+        tout = getattr(res,"universe",res)
+        rows = tout.size if isinstance(tout,Table) else NULL_LONG
+        self._publish(name,"done",tm.wall_s,tm.peak_heap_mb,rows,"")
+        print(f"[+] Warm-up {name:24s} wall={tm.wall_s:.3f}s heap={tm.peak_heap_mb:.0f}MB")
+
+    def _publish(self,name:str,status:str,wall_s:float,peak_heap_mb:float,rows:int,message:str) -> None:
+
+        row = new_table([
+            long_col("__t",[time.time_ns()]),
+            string_col("step",[name]),
+            string_col("status",[status]),
+            double_col("wall_s",[wall_s]),
+            double_col("peak_heap_mb",[peak_heap_mb]),
+            long_col("rows",[rows]),
+            string_col("message",[message])
+        ])
+
+        self._publisher.add(row.update("Timestamp = epochNanosToInstant(__t)").view(list(self.STATUS.keys())))
+
+#########################################
+#########################################
+
+# Plans: steps to run for one app
+
+def universes(root:str="data/",**kwargs) -> typing.Dict:
+
+    """
+    Read the parquet tables and run the fromDB enrichment
+    """
+
+    from data.dbclient import DBHClient
+    from data.analysis import MBP1,TCBBO
+
+    return {
+        "dbclient": lambda w:DBHClient(root),
+        "mbp1": lambda w:MBP1.fromDB(w.get("dbclient")),
+        "tcbbo": lambda w:TCBBO.fromDB(w.get("dbclient"))
+    }
+
+def sample(root:str="data/",n:int=10000) -> typing.Dict|None:
+
+    """
+    The first rows of the real tables, through the same enrichment as fromDB (same column types as the real runs),
+    None if the tables are not there
+    """
+
+    from data.dbclient import DBHClient,timeBuckets
+    from data.analysis import MBP1,TCBBO
+
+    if not all([os.path.exists(os.path.join(root,"db",t)) for t in ["databento_nbbo","opra_trades","options"]]):
+        return None
+
+    dbc = DBHClient(root)
+    nbbo = dbc.readTable("databento_nbbo").head(n)
+    opra = timeBuckets(dbc.readTable("opra_trades").head(max(1,n//10)))
+
+    return {"mbp1":MBP1.fromTable(dbc,nbbo),"tcbbo":TCBBO.fromTables(dbc,opra,dbc.options(),dbc.feeds)}
+
+def exercise(m) -> None:
+
+    """
+    Run the default filter and aggregation of every chart type of a dashboard Manager
+    """
+
+    for ct in m.chartTypes():
+        st = m.defaults(ct)
+        filt = m.filterTable(st["filter_values"],st["by_values"])
+        m.aggregateTable(filt["filtered_table"],ct,st["by_values"],st["metric_values"],st["modifiers"])
+
+def dashboards(managers:typing.Callable[["Warmup"],typing.List]) -> typing.Callable[["Warmup"],None]:
+
+    """
+    Step exercising the Managers returned by managers(warmup), e.g. in an app: declare({"app": dashboards(lambda w:[gui])})
+    """
+
+    def step(w:"Warmup") -> None:
+        for m in managers(w):
+            exercise(m)
+
+    return step
+
+def formulas(root:str="data/",n:int=10000,seed:int=0,**kwargs) -> typing.Dict:
+
+    """
+    Compile the formulas of the analyses and of the dashboards on top of them by running everything on a small
+    slice of the real tables under root: compiled formulas are cached by the engine per column types and reused by
+    the real runs. Without the real tables, synthetic data of bench is used (column types may differ, so the real
+    runs can still compile)
+    """
+
+    import bench
+    from data.analysis import Mbp1Gui,OpraFeatGui,OpraMoveGui
+
+    def analyses(w:Warmup) -> typing.Dict[str,Table]:
+
+        ds = sample(root,n)
+        if ds is None:
+            print(f"[-] Warm-up: no tables under {root}, formulas compiled on synthetic data")
+            ds = bench.dataset(n,seed=seed)
+
+        return {name:op() for name,(tin,op) in bench.operations(ds).items()}
+
+    def managers(w:Warmup) -> typing.List:
+        res = w.get("formulas.analyses")
+        return [Mbp1Gui(res["MBP1.analyzeEvents"]),OpraFeatGui(res["TCBBO.analyzeTag"]),OpraMoveGui(res["TCBBO.analyzeMove"])]
+
+    return {
+        "formulas.analyses": analyses,
+        "formulas.dashboards": dashboards(managers)
+    }
+
+PLANS = {
+    "universes": universes,
+    "formulas": formulas
+}
+
+def plan(names:typing.List[str],**kwargs) -> typing.Dict:
+
+    """
+    Steps of the named plans, in order. kwargs are passed to every plan (each one picks its own)
+    """
+
+    steps = dict()
+    for name in names:
+        steps.update(PLANS[name](**kwargs))
+
+    return steps
+
+#########################################
+#########################################
+
+_current = None
+_declared = dict()
+
+def declare(steps:typing.Dict) -> None:
+    """
+    Warm-up steps of an app, called while the app is initialized: run by appstart.py once the server is up
+    """
+    _declared.update(steps)
+
+def declared() -> typing.Dict:
+    return dict(_declared)
+
+def start(steps:typing.Dict) -> Warmup:
+    global _current
+    _current = Warmup(steps).start()
+    return _current
+
+def current() -> Warmup|None:
+    return _current
+
+def get(name:str,timeout:float|None=None):
+    """
+    Result of a warm-up step of the running app, e.g. warmup.get("mbp1").analyzeEvents(...)
+    """
+    if _current is None:
+        raise RuntimeError("No warm-up running")
+    return _current.get(name,timeout)